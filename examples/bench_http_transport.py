@@ -0,0 +1,84 @@
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src'))
+
+import dashscope
+from aiohttp import web
+
+from dashscope_utils.clients import DashScopeClient, DashScopeHTTPTransport
+
+# 本地桩服务返回的固定响应，结构与 DashScope 文本生成接口一致
+STUB_RESPONSE = {
+    "output": {"choices": [{"finish_reason": "stop", "message": {"role": "assistant", "content": "ok"}}]},
+    "usage": {"input_tokens": 5, "output_tokens": 1, "total_tokens": 6},
+    "request_id": "stub-request-id",
+}
+
+TOTAL_REQUESTS = int(os.getenv("BENCH_REQUESTS", "2000"))
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", "50"))
+
+
+async def handle_generation(request: web.Request) -> web.Response:
+    await request.read()
+    return web.json_response(STUB_RESPONSE)
+
+
+async def start_stub_server() -> Tuple[web.AppRunner, str]:
+    app = web.Application()
+    app.router.add_post("/api/v1/services/aigc/text-generation/generation", handle_generation)
+    app.router.add_post("/api/v1/services/aigc/multimodal-generation/generation", handle_generation)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}/api/v1"
+
+
+async def run(client: DashScopeClient, label: str) -> None:
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies = []
+
+    async def one(i: int) -> None:
+        payload = {"messages": [{"role": "user", "content": f"ping {i}"}], "result_format": "message"}
+        async with semaphore:
+            start = time.perf_counter()
+            await client.chat(payload)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(TOTAL_REQUESTS)])
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"{label:<12} 吞吐 {TOTAL_REQUESTS / elapsed:8.1f} req/s | p50 {p50:6.2f} ms | p99 {p99:6.2f} ms")
+
+
+async def main() -> None:
+    """对比 SDK 接口与直连连接池在本地桩服务上的单次调用开销"""
+    runner, base_url = await start_stub_server()
+    dashscope.base_http_api_url = base_url
+    print(f"桩服务: {base_url}，请求数 {TOTAL_REQUESTS}，并发 {CONCURRENCY}")
+
+    try:
+        sdk_client = DashScopeClient(api_key="stub-key", default_model="qwen-plus", timeout=30)
+        async with sdk_client:
+            await run(sdk_client, "SDK")
+
+        transport = DashScopeHTTPTransport(base_url=base_url, pool_size=CONCURRENCY)
+        pooled_client = DashScopeClient(api_key="stub-key", default_model="qwen-plus", timeout=30, transport=transport)
+        async with pooled_client:
+            await run(pooled_client, "HTTP 连接池")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -45,12 +45,9 @@ async def main():
         print(response)
         print()
         
-        # 尝试提取消息内容
-        if isinstance(response, dict):
-            if "output" in response and "choices" in response["output"]:
-                message_content = response["output"]["text"]
-                print("💬 AI回复:")
-                print(message_content)
+        # 提取消息内容
+        print("💬 AI回复:")
+        print(response.text)
         
     except Exception as e:
         print(f"❌ 请求失败: {e}")
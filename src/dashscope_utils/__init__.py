@@ -3,17 +3,36 @@
  
 from .clients.base import BaseLLMClient
 from .clients.dashscope_client import DashScopeClient
+from .clients.embedding_client import DashScopeEmbeddingClient
+from .clients.http_transport import DashScopeHTTPTransport
+from .circuit_breaker import CircuitBreaker, CircuitBreakerRegistry
+from .errors import APIStatusError, CircuitOpenError, DeadlineExceeded, QueueFullError
 from .manager import RateLimitManager
+from .packing import PromptPacker
+from .tracing import Tracer, set_tracer
 from .types import ChatPayload, ChatResult
-from .utils import DashScopeFileUploader, upload_file_to_oss
+from .utils import DashScopeFileUploader, UploadScheduler, set_upload_scheduler, upload_file_to_oss
 
 __all__ = [
      "BaseLLMClient",
      "DashScopeClient",
+    "DashScopeEmbeddingClient",
+    "DashScopeHTTPTransport",
      "RateLimitManager",
+    "PromptPacker",
+    "Tracer",
+    "set_tracer",
+    "APIStatusError",
+    "DeadlineExceeded",
+    "QueueFullError",
+    "CircuitBreaker",
+    "CircuitBreakerRegistry",
+    "CircuitOpenError",
     "ChatPayload",
     "ChatResult",
     "DashScopeFileUploader",
     "upload_file_to_oss",
+    "UploadScheduler",
+    "set_upload_scheduler",
  ]
 
@@ -0,0 +1,222 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from .errors import APIStatusError, CircuitOpenError
+
+# 视为模型侧故障的状态码：请求超时、限流与服务端错误
+_FAILURE_STATUS_CODES = {408, 429}
+
+
+class CircuitBreaker:
+    """单个模型的熔断器。
+
+    - closed: 正常放行，按滑动窗口统计失败率与慢调用率，超过阈值则打开。
+    - open: 直接拒绝，``open_duration`` 秒后进入 half_open。
+    - half_open: 最多放行 ``half_open_max_calls`` 个探测请求，全部成功则关闭，任一失败或过慢则重新打开。
+
+    每次状态切换都会递增代数（generation）。``allow_request`` 返回放行时的代数，
+    上报结果时需原样传回；切换前放行、切换后才返回的请求（如打开前已在等待超时的调用）
+    不会影响新状态，也不会占用半开探测名额。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        *,
+        window_size: int = 50,
+        min_calls: int = 10,
+        failure_rate_threshold: float = 0.5,
+        slow_call_threshold: Optional[float] = None,
+        slow_call_rate_threshold: float = 0.5,
+        open_duration: float = 30.0,
+        half_open_max_calls: int = 3,
+    ) -> None:
+        """
+        Args:
+            window_size: 滑动窗口内保留的最近调用数
+            min_calls: 窗口内至少有多少次调用才会计算比率
+            failure_rate_threshold: 失败率阈值（0~1）
+            slow_call_threshold: 慢调用耗时阈值（秒），None 表示不统计慢调用
+            slow_call_rate_threshold: 慢调用率阈值（0~1）
+            open_duration: 打开状态持续时间（秒），之后进入半开探测
+            half_open_max_calls: 半开状态下放行的探测请求数
+        """
+        if window_size <= 0 or min_calls <= 0 or half_open_max_calls <= 0:
+            raise ValueError("window_size、min_calls 与 half_open_max_calls 必须为正整数")
+        self._window: Deque[Tuple[bool, bool]] = deque(maxlen=window_size)
+        self._min_calls = min_calls
+        self._failure_rate_threshold = failure_rate_threshold
+        self._slow_call_threshold = slow_call_threshold
+        self._slow_call_rate_threshold = slow_call_rate_threshold
+        self._open_duration = open_duration
+        self._half_open_max_calls = half_open_max_calls
+
+        self._state = self.CLOSED
+        self._generation = 0
+        self._opened_at = 0.0
+        self._half_open_inflight = 0
+        self._half_open_successes = 0
+        self._rejected = 0
+        self._opened_count = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self._open_duration:
+            self._transition(self.HALF_OPEN)
+        return self._state
+
+    def allow_request(self) -> Optional[int]:
+        """尝试放行一个请求。
+
+        Returns:
+            放行时返回当前代数，之后必须以该代数调用 record_success / record_failure / release 之一；
+            拒绝时返回 None
+        """
+        state = self.state
+        if state == self.CLOSED:
+            return self._generation
+        if state == self.HALF_OPEN and self._half_open_inflight < self._half_open_max_calls:
+            self._half_open_inflight += 1
+            return self._generation
+        self._rejected += 1
+        return None
+
+    def record_success(self, generation: int, latency: float) -> None:
+        slow = self._slow_call_threshold is not None and latency >= self._slow_call_threshold
+        self._record(generation, failed=False, slow=slow)
+
+    def record_failure(self, generation: int) -> None:
+        self._record(generation, failed=True, slow=False)
+
+    def release(self, generation: int) -> None:
+        """请求未真正发往模型（如被取消、排队超时）时归还探测名额，不计入统计。"""
+        if generation != self._generation:
+            return
+        if self._state == self.HALF_OPEN and self._half_open_inflight > 0:
+            self._half_open_inflight -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """返回当前状态与窗口统计，便于监控。"""
+        calls = len(self._window)
+        failures = sum(1 for failed, _ in self._window if failed)
+        slow = sum(1 for _, is_slow in self._window if is_slow)
+        return {
+            "state": self.state,
+            "calls": calls,
+            "failure_rate": failures / calls if calls else 0.0,
+            "slow_call_rate": slow / calls if calls else 0.0,
+            "rejected": self._rejected,
+            "opened_count": self._opened_count,
+        }
+
+    def _record(self, generation: int, *, failed: bool, slow: bool) -> None:
+        if generation != self._generation:
+            # 上一个状态放行的请求迟到返回，不影响当前状态
+            return
+
+        if self._state == self.HALF_OPEN:
+            if self._half_open_inflight > 0:
+                self._half_open_inflight -= 1
+            if failed or slow:
+                self._transition(self.OPEN)
+                return
+            self._half_open_successes += 1
+            if self._half_open_successes >= self._half_open_max_calls:
+                self._transition(self.CLOSED)
+            return
+
+        self._window.append((failed, slow))
+        calls = len(self._window)
+        if calls < self._min_calls:
+            return
+        failure_rate = sum(1 for f, _ in self._window if f) / calls
+        slow_rate = sum(1 for _, s in self._window if s) / calls
+        if failure_rate >= self._failure_rate_threshold or (
+            self._slow_call_threshold is not None and slow_rate >= self._slow_call_rate_threshold
+        ):
+            self._transition(self.OPEN)
+
+    def _transition(self, state: str) -> None:
+        self._state = state
+        self._generation += 1
+        self._half_open_inflight = 0
+        self._half_open_successes = 0
+        if state == self.OPEN:
+            self._opened_at = time.monotonic()
+            self._opened_count += 1
+        elif state == self.CLOSED:
+            self._window.clear()
+
+
+class CircuitBreakerRegistry:
+    """按模型维护熔断器，并在主模型熔断时按回退链路由到其他模型。
+
+    Example:
+        >>> breakers = CircuitBreakerRegistry(
+        ...     fallbacks={"qwen3-vl-plus": ["qwen-vl-plus"]},
+        ...     failure_rate_threshold=0.5,
+        ...     slow_call_threshold=60,
+        ... )
+        >>> limiter = RateLimitManager(client, concurrency=5, breakers=breakers)
+    """
+
+    def __init__(self, fallbacks: Optional[Dict[str, List[str]]] = None, **breaker_kwargs: Any) -> None:
+        """
+        Args:
+            fallbacks: 模型 -> 回退模型列表（按优先级排列）；未配置回退的模型熔断时直接快速失败
+            **breaker_kwargs: 传给每个 CircuitBreaker 的参数
+        """
+        self._fallbacks = {model: list(chain) for model, chain in (fallbacks or {}).items()}
+        self._breaker_kwargs = breaker_kwargs
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._rerouted = 0
+        # 提前校验参数，避免首个请求时才报错
+        CircuitBreaker(**breaker_kwargs)
+
+    def get(self, model: str) -> CircuitBreaker:
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            breaker = self._breakers[model] = CircuitBreaker(**self._breaker_kwargs)
+        return breaker
+
+    def route(self, model: str) -> Tuple[str, int]:
+        """返回第一个允许放行的模型（主模型优先）及其放行代数，全部熔断时抛出 CircuitOpenError。"""
+        for candidate in [model, *self._fallbacks.get(model, [])]:
+            generation = self.get(candidate).allow_request()
+            if generation is not None:
+                if candidate != model:
+                    self._rerouted += 1
+                return candidate, generation
+        raise CircuitOpenError(f"模型 {model} 及其回退模型均已熔断")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """返回所有模型的熔断状态与回退次数。"""
+        return {
+            "rerouted": self._rerouted,
+            "models": {model: breaker.snapshot() for model, breaker in self._breakers.items()},
+        }
+
+
+def is_model_failure(exc: BaseException) -> bool:
+    """判断异常是否代表模型侧故障（5xx、408/429、超时与连接错误）。
+
+    参数错误、内容审核失败等 4xx 以及调用方代码抛出的异常不计入熔断失败率，
+    避免一批畸形输入就把流量全部切到回退模型。
+    """
+    if isinstance(exc, APIStatusError):
+        try:
+            status_code = int(exc.status_code)
+        except (TypeError, ValueError):
+            return False
+        return status_code >= 500 or status_code in _FAILURE_STATUS_CODES
+    return isinstance(exc, (asyncio.TimeoutError, ConnectionError, aiohttp.ClientConnectionError))
+
+
+__all__ = ["CircuitBreaker", "CircuitBreakerRegistry", "is_model_failure"]
@@ -1,4 +1,6 @@
 from .base import BaseLLMClient
 from .dashscope_client import DashScopeClient
+from .embedding_client import DashScopeEmbeddingClient
+from .http_transport import DashScopeHTTPTransport
 
-__all__ = ["BaseLLMClient", "DashScopeClient"]
\ No newline at end of file
+__all__ = ["BaseLLMClient", "DashScopeClient", "DashScopeEmbeddingClient", "DashScopeHTTPTransport"]
\ No newline at end of file
@@ -1,11 +1,27 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Generic, Optional, TypeVar
 
-from dashscope_utils.types import ChatPayload, ChatResult
+from dashscope_utils.deadline import DEADLINE_AT_KEY, check_deadline, deadline_reached, stamp_deadline
+from dashscope_utils.errors import DeadlineExceeded
+from dashscope_utils.tracing import span, trace_request
+from dashscope_utils.types import ChatPayload
 
+# 客户端的返回类型：对话客户端为 ChatResult，向量客户端为 np.ndarray
+ResultT = TypeVar("ResultT")
 
-class BaseLLMClient(ABC):
-    """抽象客户端，留出 payload 预处理与发送的扩展点。"""
+
+class BaseLLMClient(ABC, Generic[ResultT]):
+    """抽象客户端，留出 payload 预处理与发送的扩展点。
+
+    子类通常只需实现：
+
+    - ``_prepare_payload``：同步预处理（媒体编码、上传等），也可重写异步的 ``prepare``；
+    - ``_execute_chat``：实际发送请求。
+
+    RateLimitManager 会在获取限流槽位前调用 ``prepare``，拿到槽位后再调用 ``execute``。
+    重写 ``chat`` 的子类不会被拆分调度，限流器会整体调用其 ``chat``。
+    """
 
     def __init__(
         self,
@@ -17,9 +33,36 @@ class BaseLLMClient(ABC):
         self.base_url = base_url
         self.default_model = default_model
 
-    async def chat(self, payload: ChatPayload) -> ChatResult:
+    async def chat(self, payload: ChatPayload) -> ResultT:
+        # 截止时间与 trace ID 写入副本，调用方的 payload 可原样重试或复用
+        payload = dict(payload)
+        with trace_request(payload, "client.chat", client=type(self).__name__):
+            with span("prepare"):
+                prepared = await self.prepare(payload)
+            with span("api_call", model=prepared.get("model") or self.default_model):
+                return await self.execute(prepared)
+
+    async def prepare(self, payload: ChatPayload) -> ChatPayload:
+        """预处理阶段：可独立于 execute 调度（RateLimitManager 在获取限流槽位前调用）。"""
+        deadline_at = stamp_deadline(payload)
         prepared = self._prepare_payload(payload)
-        return await self._execute_chat(prepared)
+        check_deadline(deadline_at, "prepare")
+        return prepared
+
+    async def execute(self, prepared_payload: ChatPayload) -> ResultT:
+        """调用阶段：发送已预处理的 payload。
+
+        剩余截止预算会作为请求超时下发；因预算耗尽而触发的超时转换为 DeadlineExceeded，
+        与模型响应慢导致的超时区分开（后者计入熔断失败率）。
+        """
+        try:
+            return await self._execute_chat(prepared_payload)
+        except DeadlineExceeded:
+            raise
+        except asyncio.TimeoutError as e:
+            if deadline_reached(prepared_payload.get(DEADLINE_AT_KEY)):
+                raise DeadlineExceeded("请求在 api_call 阶段超过截止时间") from e
+            raise
 
     def _prepare_payload(self, payload: ChatPayload) -> ChatPayload:
         """
@@ -28,7 +71,16 @@ class BaseLLMClient(ABC):
         """
         return payload
 
+    async def aclose(self) -> None:
+        """子类可覆盖：释放连接池等资源。"""
+
+    async def __aenter__(self) -> "BaseLLMClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+
     @abstractmethod
-    async def _execute_chat(self, prepared_payload: ChatPayload) -> ChatResult:
+    async def _execute_chat(self, prepared_payload: ChatPayload) -> ResultT:
         """子类实现实际的调用逻辑。"""
         raise NotImplementedError
@@ -1,18 +1,24 @@
 import asyncio
+import contextvars
 from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, Optional
 
 from dashscope.aigc.generation import AioGeneration
 from dashscope.aigc.multimodal_conversation import AioMultiModalConversation
-from ..utils.media_utils import process_media_content
+from ..deadline import RESERVED_PAYLOAD_KEYS, check_deadline, effective_timeout, run_with_deadline, stamp_deadline
+from ..errors import APIStatusError
+from ..types import ChatResult
+from ..utils.media_utils import process_media_content, upload_local_media
 
-from .base import BaseLLMClient, ChatPayload, ChatResult
+from .base import BaseLLMClient, ChatPayload
+from .http_transport import DashScopeHTTPTransport
  
-class DashScopeClient(BaseLLMClient):
+class DashScopeClient(BaseLLMClient[ChatResult]):
     """
     基于 DashScope 官方 SDK 的适配任务实现。
 
     - 直接使用官方异步接口 AioGeneration / AioMultiModalConversation，兼容多模态。
+    - 可选传入 DashScopeHTTPTransport，通过客户端持有的连接池直连 REST 接口。
     """
 
     def __init__(
@@ -23,7 +29,19 @@ class DashScopeClient(BaseLLMClient):
         timeout: float = 300,
         temp_dir: Optional[str] = None,
         max_workers: Optional[int] = None,
+        keep_raw_response: bool = False,
+        transport: Optional[DashScopeHTTPTransport] = None,
+        upload_workers: Optional[int] = None,
     ) -> None:
+        """
+        Args:
+            max_workers: 普通预处理（图片编码等）线程池大小
+            keep_raw_response: 是否在 ChatResult.raw 中保留原始 SDK 响应，默认不保留以节省内存
+            transport: 可选的直连 HTTP 传输层；为 None 时使用 SDK 异步接口。
+                传入后由客户端负责关闭，建议配合 ``async with client:`` 使用
+            upload_workers: 可能需要上传文件（本地视频，或直连模式下的本地媒体）的预处理所用线程池大小。
+                与普通预处理分开，排队等待上传的请求不会占满线程池、拖慢纯文本与图片请求
+        """
         super().__init__(api_key=api_key, base_url=base_url, default_model=default_model)
         self._api_key = api_key
         self._base_url = base_url
@@ -31,24 +49,66 @@ class DashScopeClient(BaseLLMClient):
         self._timeout = timeout
         self._temp_dir = temp_dir
         self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._upload_executor = ThreadPoolExecutor(max_workers=upload_workers)
+        self._keep_raw_response = keep_raw_response
+        self._transport = transport
 
     def _prepare_payload(self, payload: ChatPayload) -> ChatPayload:
-        """同步方法，会在线程池中执行"""
-        messages = payload.get("messages", [])
+        """同步方法，会在线程池中执行
+
+        媒体处理作用于 messages 的副本，调用方的 payload 保持原样，可直接重试或复用。
+        """
+        if "messages" not in payload:
+            return payload
         model_name = payload.get("model") or self._default_model or "qwen-vl-plus"
         
-        for msg in messages:
-            content = msg.get("content")
+        messages = []
+        for msg in payload["messages"]:
+            content = msg.get("content") if isinstance(msg, dict) else None
             if isinstance(content, list):
-                msg["content"] = process_media_content(content, self._api_key, model_name, self._temp_dir)
+                content = [dict(entry) if isinstance(entry, dict) else entry for entry in content]
+                content = process_media_content(content, self._api_key, model_name, self._temp_dir)
+                if self._transport is not None:
+                    # 直连接口不会自动上传本地文件，这里提前上传
+                    content = upload_local_media(content, self._api_key, model_name)
+                msg = {**msg, "content": content}
+            messages.append(msg)
         
-        return payload
+        return {**payload, "messages": messages}
 
-    async def chat(self, payload: ChatPayload) -> ChatResult:
-        """重写 chat 方法，将 CPU 密集型的 _prepare_payload 放到线程池执行"""
+    async def prepare(self, payload: ChatPayload) -> ChatPayload:
+        """重写 prepare 方法，将 CPU 密集型的 _prepare_payload 放到线程池执行"""
+        deadline_at = stamp_deadline(payload)
+        # 预处理前后各检查一次截止时间，避免为已放弃的请求做编码/上传
+        check_deadline(deadline_at, "prepare")
         loop = asyncio.get_event_loop()
-        prepared = await loop.run_in_executor(self._executor, self._prepare_payload, payload)
-        return await self._execute_chat(prepared)
+        # 复制上下文，使线程池中的媒体处理埋点归属到当前 trace，上传排队也能读到截止时间
+        ctx = contextvars.copy_context()
+        executor = self._upload_executor if self._may_upload(payload) else self._executor
+        prepared = await loop.run_in_executor(executor, ctx.run, run_with_deadline, deadline_at,
+                                              self._prepare_payload, payload)
+        check_deadline(deadline_at, "prepare")
+        return prepared
+
+    def _may_upload(self, payload: ChatPayload) -> bool:
+        """预处理是否可能上传文件：本地视频文件，或直连模式下任何本地媒体。"""
+        keys = ("image", "video", "audio") if self._transport is not None else ("video",)
+        for msg in payload.get("messages") or []:
+            content = msg.get("content") if isinstance(msg, dict) else None
+            if not isinstance(content, list):
+                continue
+            for entry in content:
+                if not isinstance(entry, dict):
+                    continue
+                for key in keys:
+                    value = entry.get(key)
+                    # 视频帧列表只做图片编码；直连模式下列表中的本地文件也会上传
+                    if isinstance(value, list) and key == "video" and self._transport is None:
+                        continue
+                    values = value if isinstance(value, list) else [value]
+                    if any(isinstance(v, str) and v.startswith("file://") for v in values):
+                        return True
+        return False
 
     async def _execute_chat(self, prepared_payload: ChatPayload) -> ChatResult:
         
@@ -63,29 +123,53 @@ class DashScopeClient(BaseLLMClient):
         extra = {
             k: v
             for k, v in prepared_payload.items()
-            if k not in {"model", "messages", "timeout"}
+            if k not in _RESERVED_PAYLOAD_KEYS
         }
+        # 剩余截止预算作为 SDK 请求超时下发
+        timeout = effective_timeout(prepared_payload, self._timeout)
 
-        if use_multimodal:
+        if self._transport is not None:
+            result = await self._transport.call(model=model,
+                                                messages=messages,
+                                                api_key=self._api_key,
+                                                multimodal=use_multimodal,
+                                                parameters=extra,
+                                                timeout=timeout)
+        elif use_multimodal:
             result = await AioMultiModalConversation.call(model=model,
                                                           messages=messages,
                                                           api_key=self._api_key,
-                                                          timeout=self._timeout if prepared_payload.get("timeout") is None else prepared_payload.get("timeout"),
+                                                          request_timeout=timeout,
                                                           **extra)
         else:
             result = await AioGeneration.call(model=model, 
                                               messages=messages,
                                               api_key=self._api_key,
-                                              timeout=self._timeout if prepared_payload.get("timeout") is None else prepared_payload.get("timeout"),
+                                              request_timeout=timeout,
                                               **extra)
             
         # 检查 status_code 是否为 200，否则抛出异常
-        status_code = getattr(result, 'status_code', None)
+        if isinstance(result, dict):
+            status_code, code = result.get('status_code'), result.get('code')
+        else:
+            status_code, code = getattr(result, 'status_code', None), getattr(result, 'code', None)
         
         if status_code != 200:
-            raise Exception(f'dashscope 请求失败, status_code={status_code}, result={result}')
+            raise APIStatusError(f'dashscope 请求失败, status_code={status_code}, result={result}',
+                                 status_code=status_code, code=code)
     
-        return result if isinstance(result, dict) else {"response": result}
+        return ChatResult.from_response(result, keep_raw=self._keep_raw_response)
+
+    async def aclose(self) -> None:
+        """释放连接池与线程池。"""
+        if self._transport is not None:
+            await self._transport.close()
+        self._executor.shutdown(wait=False)
+        self._upload_executor.shutdown(wait=False)
+
+
+# 不透传给 SDK 的 payload 字段
+_RESERVED_PAYLOAD_KEYS = RESERVED_PAYLOAD_KEYS | {"messages"}
 
 
 def _contains_multimodal_content(messages: Any) -> bool:
@@ -0,0 +1,179 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional, Sequence, Set, Tuple
+
+from dashscope import TextEmbedding
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - 可选依赖
+    np = None
+
+from ..circuit_breaker import is_model_failure
+from ..deadline import RESERVED_PAYLOAD_KEYS, effective_timeout
+from ..errors import APIStatusError
+from ..manager import RateLimitManager
+from .base import BaseLLMClient, ChatPayload
+
+
+class DashScopeEmbeddingClient(BaseLLMClient["np.ndarray"]):
+    """
+    文本向量客户端，自动合并并发的单条 embed() 调用。
+
+    - 单次请求最多 ``max_batch_size`` 条文本（text-embedding-v3/v4 为 10，v1/v2 为 25）。
+    - 未凑满时等待 ``max_wait`` 秒后发送当前批次。
+    - 批次请求可经内部 RateLimitManager 限流（rps 与 concurrency 二选一）。
+    - 结果以 float32 的 NumPy 数组返回，需要安装 numpy。
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        default_model: Optional[str] = "text-embedding-v4",
+        timeout: float = 60,
+        max_batch_size: int = 10,
+        max_wait: float = 0.01,
+        rps: Optional[float] = None,
+        concurrency: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        **params: Any,
+    ) -> None:
+        """
+        Args:
+            max_batch_size: 单次请求的最大文本条数
+            max_wait: 批次未凑满时的最长等待时间（秒）
+            rps: 批次请求的每秒请求数上限，与 concurrency 二选一；都不传则不限流
+            concurrency: 批次请求的并发数上限
+            **params: 透传给接口的参数，如 dimension、text_type
+        """
+        if np is None:
+            raise ImportError("DashScopeEmbeddingClient 需要 numpy，请执行 pip install 'dashscope-utils[embedding]'")
+        if max_batch_size <= 0:
+            raise ValueError("max_batch_size 必须为正整数")
+        super().__init__(api_key=api_key, base_url=base_url, default_model=default_model)
+        self._timeout = timeout
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait
+        self._params = params
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._limiter = (
+            RateLimitManager(self, rps=rps, concurrency=concurrency)
+            if rps is not None or concurrency is not None
+            else None
+        )
+
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._batch_tasks: Set[asyncio.Task] = set()
+
+    async def embed(self, text: str) -> "np.ndarray":
+        """获取单条文本的向量（一维 float32 数组），并发调用会被自动合并为批次请求。"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self._max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self._max_wait, self._flush)
+        return await future
+
+    async def embed_many(self, texts: Sequence[str]) -> "np.ndarray":
+        """获取多条文本的向量，返回形状为 (len(texts), dim) 的数组。"""
+        vectors = await asyncio.gather(*[self.embed(text) for text in texts])
+        return np.stack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending[:self._max_batch_size], self._pending[self._max_batch_size:]
+        if self._pending:
+            # 剩余部分继续等待下一次定时刷新
+            self._flush_handle = asyncio.get_running_loop().call_later(self._max_wait, self._flush)
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._run_batch(batch))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        try:
+            embeddings = await self._send([text for text, _ in batch])
+        except Exception as e:
+            if len(batch) > 1 and isinstance(e, APIStatusError) and not is_model_failure(e):
+                # 4xx（如某条文本为空或超长）可能只由其中一条引起，逐条重试，避免拖累同批次的其他调用
+                await asyncio.gather(*[self._run_batch([item]) for item in batch])
+                return
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        if len(embeddings) != len(batch):
+            error = RuntimeError(f"向量数量与输入不符: 期望 {len(batch)}, 实际 {len(embeddings)}")
+        else:
+            error = None
+            for (_, future), vector in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(vector)
+        # 兜底：任何未拿到结果的调用方都收到异常，而不是一直等待
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error or RuntimeError("批次请求未返回该文本的向量"))
+
+    async def _send(self, texts: List[str]) -> "np.ndarray":
+        payload = {"model": self.default_model, "input": texts}
+        if self._limiter is not None:
+            return await self._limiter.chat(payload)
+        return await self.chat(payload)
+
+    async def _execute_chat(self, prepared_payload: ChatPayload) -> "np.ndarray":
+        """发送一个批次，返回按输入顺序排列的 (n, dim) 数组。"""
+        model = prepared_payload.get("model") or self.default_model
+        if not model:
+            raise ValueError("model 未提供，也未设置 default_model")
+
+        texts = prepared_payload.get("input")
+        extra = {
+            **self._params,
+            **{k: v for k, v in prepared_payload.items() if k not in _RESERVED_PAYLOAD_KEYS},
+        }
+        timeout = effective_timeout(prepared_payload, self._timeout)
+
+        # SDK 未提供文本向量的异步接口，放到线程池中执行
+        loop = asyncio.get_event_loop()
+        result = await loop.run_in_executor(
+            self._executor,
+            functools.partial(TextEmbedding.call, model=model, input=texts, api_key=self.api_key,
+                              request_timeout=timeout, **extra),
+        )
+
+        status_code = getattr(result, 'status_code', None)
+        if status_code != 200:
+            raise APIStatusError(f'dashscope 请求失败, status_code={status_code}, result={result}',
+                                 status_code=status_code, code=getattr(result, 'code', None))
+
+        # 按 text_index 回填，缺失或越界的序号视为接口异常，避免向量错位
+        vectors: List[Any] = [None] * len(texts)
+        for item in result.output["embeddings"]:
+            index = item["text_index"]
+            if not 0 <= index < len(texts) or vectors[index] is not None:
+                raise RuntimeError(f"接口返回了无效的 text_index: {index}")
+            vectors[index] = item["embedding"]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            raise RuntimeError(f"接口未返回以下序号的向量: {missing}")
+        return np.asarray(vectors, dtype=np.float32)
+
+    async def aclose(self) -> None:
+        """发送剩余的待合并请求，等待进行中的批次完成后释放线程池。"""
+        while self._pending:
+            self._flush()
+        if self._batch_tasks:
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
+        self._executor.shutdown(wait=False)
+
+
+# 不透传给 SDK 的 payload 字段
+_RESERVED_PAYLOAD_KEYS = RESERVED_PAYLOAD_KEYS | {"input"}
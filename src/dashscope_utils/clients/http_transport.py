@@ -0,0 +1,149 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+DEFAULT_BASE_URL = "https://dashscope.aliyuncs.com/api/v1"
+_GENERATION_PATH = "services/aigc/text-generation/generation"
+_MULTIMODAL_PATH = "services/aigc/multimodal-generation/generation"
+
+
+class DashScopeHTTPTransport:
+    """直连 DashScope REST 接口的长连接传输层。
+
+    SDK 的 AioGeneration / AioMultiModalConversation 每次调用都会新建 ClientSession，
+    高 RPS 下连接建立开销明显。本传输层持有一个长生命周期的 aiohttp 连接池，
+    复用 keep-alive 连接并缓存 DNS，请求体与 SDK 发出的一致，返回同结构的 JSON dict。
+
+    注意：不支持流式输出，也不会像 SDK 那样自动上传本地 file:// 文件，
+    DashScopeClient 在使用本传输层时会在预处理阶段先将本地文件上传到 OSS。
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        pool_size: int = 100,
+        keepalive_timeout: float = 30.0,
+        dns_cache_ttl: Optional[int] = 300,
+    ) -> None:
+        """
+        Args:
+            base_url: API 基础地址，默认为 DashScope 公网地址
+            pool_size: 连接池最大连接数
+            keepalive_timeout: 空闲连接保持时间（秒）
+            dns_cache_ttl: DNS 缓存时间（秒），None 表示永久缓存
+        """
+        if pool_size <= 0:
+            raise ValueError("pool_size 必须为正整数")
+        self.base_url = (base_url or DEFAULT_BASE_URL).rstrip("/")
+        self.pool_size = pool_size
+        self._keepalive_timeout = keepalive_timeout
+        self._dns_cache_ttl = dns_cache_ttl
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_lock = asyncio.Lock()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        # 连接池需在事件循环内创建，首次调用时惰性初始化
+        if self._session is not None and not self._session.closed:
+            return self._session
+        async with self._session_lock:
+            if self._session is None or self._session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=self.pool_size,
+                    limit_per_host=self.pool_size,
+                    keepalive_timeout=self._keepalive_timeout,
+                    ttl_dns_cache=self._dns_cache_ttl,
+                    use_dns_cache=True,
+                )
+                self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def call(
+        self,
+        *,
+        model: str,
+        messages: List[Dict[str, Any]],
+        api_key: str,
+        multimodal: bool,
+        parameters: Dict[str, Any],
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """发送一次生成请求。
+
+        Args:
+            model: 模型名称
+            messages: 消息列表
+            api_key: API Key
+            multimodal: 是否调用多模态接口
+            parameters: 透传给接口的其余参数（temperature、enable_thinking 等）
+            timeout: 请求总超时（秒）
+
+        Returns:
+            响应 JSON（附带 status_code 字段），结构与 SDK 响应一致
+        """
+        parameters = dict(parameters)
+        if parameters.get("stream"):
+            raise ValueError("DashScopeHTTPTransport 不支持流式输出 (stream=True)")
+
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            **(parameters.pop("headers", None) or {}),
+        }
+        workspace = parameters.pop("workspace", None)
+        if workspace:
+            headers["X-DashScope-WorkSpace"] = workspace
+        if _contains_oss_url(messages):
+            headers["X-DashScope-OssResourceResolve"] = "enable"
+
+        body = {"model": model, "input": {"messages": messages}, "parameters": parameters}
+        url = f"{self.base_url}/{_MULTIMODAL_PATH if multimodal else _GENERATION_PATH}"
+
+        session = await self._get_session()
+        async with session.post(
+            url,
+            json=body,
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        ) as response:
+            if response.content_type == "application/json":
+                data = await response.json()
+            else:
+                data = {"code": "Unknown", "message": await response.text()}
+        data["status_code"] = response.status
+        return data
+
+    async def close(self) -> None:
+        """关闭连接池。"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self) -> "DashScopeHTTPTransport":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+
+def _contains_oss_url(messages: Any) -> bool:
+    """检测消息中是否引用了 oss:// 资源（需要服务端解析临时存储）。"""
+    if not isinstance(messages, list):
+        return False
+    for msg in messages:
+        content = msg.get("content") if isinstance(msg, dict) else None
+        if not isinstance(content, list):
+            continue
+        for entry in content:
+            if not isinstance(entry, dict):
+                continue
+            for value in entry.values():
+                if isinstance(value, str) and value.startswith("oss://"):
+                    return True
+                if isinstance(value, list) and any(isinstance(v, str) and v.startswith("oss://") for v in value):
+                    return True
+    return False
+
+
+__all__ = ["DashScopeHTTPTransport", "DEFAULT_BASE_URL"]
@@ -0,0 +1,124 @@
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Optional, TypeVar
+
+from .errors import DeadlineExceeded
+from .tracing import TRACE_ID_KEY
+from .types import ChatPayload
+
+# payload 中由调用方提供的相对截止时间（秒），覆盖排队、预处理与 API 调用全过程
+DEADLINE_KEY = "deadline"
+# 内部使用：首次进入流水线时换算出的绝对截止时间（time.monotonic()）
+DEADLINE_AT_KEY = "_deadline_at"
+
+# 由客户端单独处理或仅供本库内部使用、不透传给 SDK 的 payload 字段；
+# 各客户端在此基础上再加上自己的请求体字段（如 messages / input）
+RESERVED_PAYLOAD_KEYS = frozenset({"model", "timeout", DEADLINE_KEY, DEADLINE_AT_KEY, TRACE_ID_KEY})
+
+# 当前请求的绝对截止时间，随 copy_context 传入线程池，供上传排队等深层调用读取
+_current_deadline: ContextVar[Optional[float]] = ContextVar("dashscope_utils_deadline", default=None)
+
+_T = TypeVar("_T")
+
+# 计时器可能略早于截止时间触发，判断超时是否由截止预算导致时留出的余量（秒）
+_DEADLINE_TOLERANCE = 0.01
+
+
+def stamp_deadline(payload: ChatPayload, default: Optional[float] = None) -> Optional[float]:
+    """为 payload 记录绝对截止时间并返回。
+
+    已记录过的 payload 保持原值不变，因此在限流器与客户端中重复调用是安全的，
+    截止时间始终从请求第一次进入流水线时开始计算。
+    RateLimitManager.chat 与客户端 chat 会先复制调用方的 payload，绝对截止时间只记录在副本上。
+
+    Args:
+        payload: 请求 payload，可包含 ``deadline``（秒）
+        default: payload 未指定 ``deadline`` 时使用的默认值，None 表示不限
+
+    Returns:
+        绝对截止时间（monotonic 秒），未设置时返回 None
+    """
+    deadline_at = payload.get(DEADLINE_AT_KEY)
+    if deadline_at is not None:
+        return deadline_at
+
+    budget = payload.get(DEADLINE_KEY)
+    if budget is None:
+        budget = default
+    if budget is None:
+        return None
+
+    deadline_at = time.monotonic() + float(budget)
+    payload[DEADLINE_AT_KEY] = deadline_at
+    return deadline_at
+
+
+def remaining_time(deadline_at: Optional[float]) -> Optional[float]:
+    """返回距截止时间的剩余秒数，未设置截止时间时返回 None。"""
+    if deadline_at is None:
+        return None
+    return deadline_at - time.monotonic()
+
+
+def check_deadline(deadline_at: Optional[float], stage: str, min_budget: float = 0.0) -> Optional[float]:
+    """检查剩余预算，不足 ``min_budget`` 时抛出 DeadlineExceeded。
+
+    Args:
+        deadline_at: 绝对截止时间
+        stage: 当前所处阶段，用于错误信息
+        min_budget: 继续执行所需的最小剩余秒数
+
+    Returns:
+        剩余秒数，未设置截止时间时返回 None
+    """
+    remaining = remaining_time(deadline_at)
+    if remaining is not None and remaining <= min_budget:
+        raise DeadlineExceeded(f"请求在 {stage} 阶段超过截止时间 (剩余 {remaining:.3f}s)")
+    return remaining
+
+
+def current_deadline() -> Optional[float]:
+    """返回当前上下文中请求的绝对截止时间，未设置时返回 None。"""
+    return _current_deadline.get()
+
+
+def run_with_deadline(deadline_at: Optional[float], func: Callable[..., _T], *args: Any) -> _T:
+    """在当前上下文中记录截止时间后调用 func。
+
+    配合 ``contextvars.copy_context().run`` 在线程池中使用，设置只作用于复制出的上下文。
+    """
+    _current_deadline.set(deadline_at)
+    return func(*args)
+
+
+def deadline_reached(deadline_at: Optional[float]) -> bool:
+    """截止时间是否已到（含少量计时误差），用于判断一次超时是否由截止预算导致。"""
+    remaining = remaining_time(deadline_at)
+    return remaining is not None and remaining <= _DEADLINE_TOLERANCE
+
+
+def effective_timeout(payload: ChatPayload, default: Optional[float]) -> Optional[float]:
+    """计算下发给 SDK 的超时：取 payload/客户端超时与剩余截止预算中较小者。"""
+    timeout = payload.get("timeout")
+    if timeout is None:
+        timeout = default
+    remaining = check_deadline(payload.get(DEADLINE_AT_KEY), "api_call")
+    if remaining is None:
+        return timeout
+    if timeout is None:
+        return remaining
+    return min(float(timeout), remaining)
+
+
+__all__ = [
+    "DEADLINE_KEY",
+    "DEADLINE_AT_KEY",
+    "RESERVED_PAYLOAD_KEYS",
+    "stamp_deadline",
+    "remaining_time",
+    "check_deadline",
+    "deadline_reached",
+    "current_deadline",
+    "run_with_deadline",
+    "effective_timeout",
+]
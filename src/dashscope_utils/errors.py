@@ -0,0 +1,30 @@
+from typing import Any, Optional
+
+
+class APIStatusError(Exception):
+    """DashScope 接口返回非 200 状态码。
+
+    Attributes:
+        status_code: HTTP 状态码
+        code: 接口返回的错误码（如 ``DataInspectionFailed``），可能为 None
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None, code: Optional[Any] = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+
+
+class DeadlineExceeded(TimeoutError):
+    """请求的截止时间已过（或剩余预算不足以完成调用），在消耗配额前被丢弃。"""
+
+
+class QueueFullError(RuntimeError):
+    """限流器的等待队列已满，请求被快速拒绝。"""
+
+
+class CircuitOpenError(RuntimeError):
+    """目标模型及其回退模型的熔断器均处于打开状态，请求被快速失败。"""
+
+
+__all__ = ["APIStatusError", "DeadlineExceeded", "QueueFullError", "CircuitOpenError"]
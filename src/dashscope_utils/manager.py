@@ -1,44 +1,237 @@
 import asyncio
+import math
 import time
-from typing import Optional
+from typing import Any, Dict, Optional
+
+from .clients.base import BaseLLMClient
+from .circuit_breaker import CircuitBreakerRegistry, is_model_failure
+from .deadline import check_deadline, stamp_deadline
+from .errors import DeadlineExceeded, QueueFullError
+from .tracing import span, trace_request
+
 
 class RateLimitManager:
-    def __init__(self, client, *, rps: Optional[float] = None, concurrency: Optional[int] = None):
+    def __init__(
+        self,
+        client,
+        *,
+        rps: Optional[float] = None,
+        concurrency: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        default_deadline: Optional[float] = None,
+        min_call_budget: float = 0.0,
+        breakers: Optional[CircuitBreakerRegistry] = None,
+        prefetch: Optional[int] = None,
+        pipeline: Optional[bool] = None,
+    ):
+        """
+        Args:
+            client: 实际发起请求的客户端
+            rps: 每秒请求数上限，与 concurrency 二选一
+            concurrency: 并发数上限，与 rps 二选一
+            max_queue: 等待槽位的最大请求数，超出时立即抛出 QueueFullError；None 表示不限
+            default_deadline: payload 未指定 ``deadline`` 时的默认截止时间（秒）；None 表示不限
+            min_call_budget: 拿到槽位后剩余预算低于该值（秒）则直接丢弃，不再发起调用
+            breakers: 按模型熔断与回退路由；熔断的模型在排队前即快速失败或改用回退模型
+            prefetch: 同时处于预处理或已预处理待发送状态的最大请求数；
+                默认 concurrency 模式为 2 * concurrency，rps 模式为 2 * rps（向上取整）
+            pipeline: 是否将预处理（prepare）与调用（execute）分开调度；
+                None 表示自动判断：仅当客户端继承 BaseLLMClient 且未重写 chat 时启用
+
+        流水线模式下，媒体编码与上传等预处理在获取限流槽位之前完成，槽位只在实际 API 调用期间占用。
+        重写了 chat 的客户端默认按原方式整体调用 chat，不会绕过其自定义逻辑。
+        """
         if (rps is None and concurrency is None) or (rps is not None and concurrency is not None):
             raise ValueError("必须在 rps 与 concurrency 中二选一")
+        if max_queue is not None and max_queue < 0:
+            raise ValueError("max_queue 不能为负数")
+        if prefetch is not None and prefetch <= 0:
+            raise ValueError("prefetch 必须为正整数")
         self.client = client
         self._rps = float(rps) if rps is not None else None
         self._concurrency = int(concurrency) if concurrency is not None else None
+        self._max_queue = max_queue
+        self._default_deadline = default_deadline
+        self._min_call_budget = float(min_call_budget)
+        self._breakers = breakers
 
         self._rps_lock = asyncio.Lock()
         self._next_available = time.monotonic()
         self._semaphore = asyncio.Semaphore(self._concurrency) if self._concurrency else None
 
+        # 预处理流水线：预处理与 API 调用分开调度
+        if pipeline is None:
+            pipeline = isinstance(client, BaseLLMClient) and type(client).chat is BaseLLMClient.chat
+        elif pipeline and not (hasattr(client, "prepare") and hasattr(client, "execute")):
+            raise ValueError("pipeline=True 要求客户端提供 prepare / execute")
+        self._pipelined = pipeline
+        if prefetch is None:
+            prefetch = 2 * self._concurrency if self._concurrency else max(1, math.ceil(2 * self._rps))
+        self._prefetch = prefetch
+        self._prefetch_semaphore = asyncio.Semaphore(prefetch)
+
+        # 排队与丢弃统计
+        self._waiting = 0
+        self._preparing = 0
+        self._rejected = 0
+        self._expired = 0
+
     async def chat(self, payload):
-        if self._rps is not None:
-            await self._acquire_rps()
-            # 如果希望同时限制并发，可在这里再加 semaphore：
+        # 截止时间、trace ID 与路由结果只写入副本，调用方的 payload 可原样重试或复用
+        payload = dict(payload)
+        with trace_request(payload, "RateLimitManager.chat"):
+            return await self._chat(payload)
+
+    async def _chat(self, payload):
+        deadline_at = stamp_deadline(payload, self._default_deadline)
+
+        # 熔断路由放在排队之前，熔断中的模型不占用队列
+        breaker = None
+        generation = 0
+        if self._breakers is not None:
+            model = payload.get("model") or getattr(self.client, "default_model", None)
+            if model:
+                routed, generation = self._breakers.route(model)
+                # payload 是 chat() 中复制的副本，回退模型不会残留在调用方的 payload 中
+                payload["model"] = routed
+                breaker = self._breakers.get(routed)
+
+        try:
+            # 有界准入队列：满了立即拒绝，不进入等待
+            if self._max_queue is not None and self._waiting >= self._max_queue:
+                self._rejected += 1
+                raise QueueFullError(f"限流队列已满 (max_queue={self._max_queue})")
+
+            self._waiting += 1
+            try:
+                if self._pipelined:
+                    payload = await self._prepare_and_acquire(payload, deadline_at)
+                else:
+                    with span("limiter.wait"):
+                        await self._acquire_slot(deadline_at)
+            except DeadlineExceeded:
+                self._expired += 1
+                raise
+            finally:
+                self._waiting -= 1
+        except BaseException:
+            if breaker is not None:
+                breaker.release(generation)
+            raise
+
+        try:
+            return await self._call(payload, breaker, generation)
+        except DeadlineExceeded:
+            # 拿到槽位后、发起调用前预算耗尽
+            self._expired += 1
+            raise
+        finally:
             if self._semaphore is not None:
-                async with self._semaphore:
-                    return await self.client.chat(payload)
+                self._semaphore.release()
+
+    async def _prepare_and_acquire(self, payload, deadline_at: Optional[float]):
+        """在限流槽位之外完成预处理，再获取槽位；prefetch 信号量限制预处理中与待发送的 payload 数量。"""
+        with span("limiter.prefetch_wait"):
+            await self._acquire_with_deadline(self._prefetch_semaphore, deadline_at, "prefetch")
+        try:
+            self._preparing += 1
+            try:
+                with span("prepare"):
+                    prepared = await self.client.prepare(payload)
+            finally:
+                self._preparing -= 1
+            with span("limiter.wait"):
+                await self._acquire_slot(deadline_at)
+        finally:
+            self._prefetch_semaphore.release()
+        return prepared
+
+    async def _send(self, payload):
+        if self._pipelined:
+            with span("api_call", model=payload.get("model") or getattr(self.client, "default_model", None)):
+                return await self.client.execute(payload)
+        return await self.client.chat(payload)
+
+    async def _call(self, payload, breaker, generation: int):
+        if breaker is None:
+            return await self._send(payload)
+
+        # 流水线模式下只统计 API 调用耗时，不含预处理
+        start = time.monotonic()
+        try:
+            result = await self._send(payload)
+        except DeadlineExceeded:
+            # 截止时间导致的丢弃不代表模型故障
+            breaker.release(generation)
+            raise
+        except Exception as e:
+            # 只有服务端错误、限流与超时计入失败率；调用方错误不代表模型故障
+            if is_model_failure(e):
+                breaker.record_failure(generation)
             else:
-                return await self.client.chat(payload)
+                breaker.release(generation)
+            raise
+        except BaseException:
+            breaker.release(generation)
+            raise
+        breaker.record_success(generation, time.monotonic() - start)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """返回排队深度、丢弃计数与熔断状态，便于监控。"""
+        stats = {
+            "queue_depth": self._waiting,
+            "preparing": self._preparing,
+            "rejected": self._rejected,
+            "expired": self._expired,
+        }
+        if self._breakers is not None:
+            stats["circuit_breakers"] = self._breakers.snapshot()
+        return stats
+
+    async def _acquire_slot(self, deadline_at: Optional[float]) -> None:
+        """获取 RPS 令牌或并发槽位；截止时间内拿不到则抛出 DeadlineExceeded 且不占用配额。"""
+        if self._rps is not None:
+            await self._acquire_rps(deadline_at)
+            # 如果希望同时限制并发，可在这里再加 semaphore：
+            if self._semaphore is None:
+                return
 
         assert self._semaphore is not None
-        async with self._semaphore:
-            return await self.client.chat(payload)
+        await self._acquire_with_deadline(self._semaphore, deadline_at, "queue")
+
+        # 拿到槽位时预算可能已不足，释放槽位后丢弃
+        try:
+            check_deadline(deadline_at, "queue", self._min_call_budget)
+        except DeadlineExceeded:
+            self._semaphore.release()
+            raise
 
-    async def _acquire_rps(self) -> None:
+    async def _acquire_with_deadline(self, semaphore: asyncio.Semaphore, deadline_at: Optional[float], stage: str) -> None:
+        """在截止时间内获取信号量，超时抛出 DeadlineExceeded。"""
+        remaining = check_deadline(deadline_at, stage, self._min_call_budget)
+        if remaining is None:
+            await semaphore.acquire()
+            return
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=remaining - self._min_call_budget)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"请求在 {stage} 阶段超过截止时间") from None
+
+    async def _acquire_rps(self, deadline_at: Optional[float] = None) -> None:
         """
         1) 在锁内计算并更新下一次可用时间（schedule_time），然后释放锁。
         2) 在锁外 sleep 到 schedule_time（如果需要）。
         这样锁不在 sleep 的时候被占用，其他协程能快速进入排队阶段。
+        若 schedule_time 已晚于截止时间，则不占用该时间片，直接抛出 DeadlineExceeded。
         """
         min_interval = 1.0 / self._rps  # type: ignore[operator]
         # 计算 schedule_time 并更新 next_available 原子地完成
         async with self._rps_lock:
             now = time.monotonic()
             schedule_time = max(self._next_available, now)
+            if deadline_at is not None and schedule_time + self._min_call_budget >= deadline_at:
+                raise DeadlineExceeded(f"请求在排队阶段超过截止时间 (需等待 {schedule_time - now:.3f}s)")
             self._next_available = schedule_time + min_interval
 
         # 在锁外等待到 schedule_time
@@ -47,5 +240,3 @@ class RateLimitManager:
         if wait > 0:
             await asyncio.sleep(wait)
         # 然后返回，允许调用方开始 client.chat()
-
-
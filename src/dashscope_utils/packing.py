@@ -0,0 +1,236 @@
+import asyncio
+import json
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .deadline import DEADLINE_AT_KEY, DEADLINE_KEY
+from .tracing import TRACE_ID_KEY
+from .types import ChatPayload, ChatResult
+
+_PACK_INSTRUCTION = (
+    "下面给出 {count} 个相互独立的编号任务，请分别完成，任务之间互不影响。\n"
+    "只输出一个 JSON 对象，键为任务编号（字符串），值为该任务的回答，例如 "
+    '{{"1": "...", "2": "..."}}，不要输出任何其他内容。'
+)
+# 打包回复中每个条目的 JSON 开销（编号、引号、逗号等）估计的 token 数
+_PACK_TOKENS_PER_ITEM = 8
+
+
+class PromptPacker:
+    """将多个小型文本任务合并为一次请求的打包层（可选启用）。
+
+    模型、system prompt 与其余参数都相同的小 payload 会在 ``max_wait`` 秒内被收集，
+    合并成一条带编号的请求发送，再把模型返回的 JSON 拆回各自的 ChatResult。
+    打包请求失败或解析失败的条目会退回单独调用。
+    payload 中的 ``max_tokens`` 按单条任务的上限理解，打包时按条目数放大。
+
+    只打包形如 ``[system?, user]`` 且 content 为纯文本的 payload；
+    多模态、多轮对话、带 deadline 或超过 ``max_item_chars`` 的请求直接透传。
+
+    Example:
+        >>> packer = PromptPacker(limiter, max_items=20, max_wait=0.05)
+        >>> result = await packer.chat({"messages": [
+        ...     {"role": "system", "content": "判断情感：正面/负面"},
+        ...     {"role": "user", "content": "今天天气真好"},
+        ... ]})
+        >>> print(result.text, packer.stats())
+    """
+
+    def __init__(self, target, *, max_items: int = 20, max_wait: float = 0.05, max_item_chars: int = 2000) -> None:
+        """
+        Args:
+            target: 实际发送请求的对象（客户端或 RateLimitManager），需提供 ``chat(payload)``
+            max_items: 单次打包的最大条目数
+            max_wait: 未凑满时的最长等待时间（秒）
+            max_item_chars: 单条用户输入超过该长度则不打包
+        """
+        if max_items <= 0:
+            raise ValueError("max_items 必须为正整数")
+        self.target = target
+        self._max_items = max_items
+        self._max_wait = max_wait
+        self._max_item_chars = max_item_chars
+
+        self._pending: Dict[str, List[Tuple[ChatPayload, str, asyncio.Future]]] = {}
+        self._flush_handles: Dict[str, asyncio.TimerHandle] = {}
+        self._batch_tasks: Set[asyncio.Task] = set()
+
+        # 统计
+        self._items = 0
+        self._api_calls = 0
+        self._packed_requests = 0
+        self._packed_items = 0
+        self._fallback_items = 0
+        self._passthrough = 0
+        self._truncated_replies = 0
+
+    async def chat(self, payload: ChatPayload) -> ChatResult:
+        self._items += 1
+        key, text = self._pack_key(payload)
+        if key is None:
+            self._passthrough += 1
+            return await self._single(payload)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        group = self._pending.setdefault(key, [])
+        group.append((payload, text, future))
+        if len(group) >= self._max_items:
+            self._flush(key)
+        elif key not in self._flush_handles:
+            self._flush_handles[key] = loop.call_later(self._max_wait, self._flush, key)
+        return await future
+
+    def stats(self) -> Dict[str, Any]:
+        """返回打包率与吞吐提升（每次 API 调用完成的逻辑请求数）。"""
+        return {
+            "items": self._items,
+            "api_calls": self._api_calls,
+            "packed_requests": self._packed_requests,
+            "packed_items": self._packed_items,
+            "fallback_items": self._fallback_items,
+            "passthrough": self._passthrough,
+            "truncated_replies": self._truncated_replies,
+            "packing_ratio": self._packed_items / self._packed_requests if self._packed_requests else 0.0,
+            "throughput_gain": self._items / self._api_calls if self._api_calls else 0.0,
+        }
+
+    async def aclose(self) -> None:
+        """发送所有待打包的请求并等待完成。"""
+        for key in list(self._pending):
+            self._flush(key)
+        if self._batch_tasks:
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
+
+    def _pack_key(self, payload: ChatPayload) -> Tuple[Optional[str], Optional[str]]:
+        """返回 (分组键, 用户输入)；不可打包时分组键为 None。"""
+        if DEADLINE_KEY in payload or DEADLINE_AT_KEY in payload or payload.get("stream"):
+            return None, None
+        messages = payload.get("messages")
+        if not isinstance(messages, list) or not 1 <= len(messages) <= 2:
+            return None, None
+        if not all(isinstance(m, dict) and isinstance(m.get("content"), str) for m in messages):
+            return None, None
+        *system, user = messages
+        if user.get("role") != "user" or (system and system[0].get("role") != "system"):
+            return None, None
+        if len(user["content"]) > self._max_item_chars:
+            return None, None
+
+        params = {k: v for k, v in payload.items() if k not in ("messages", TRACE_ID_KEY)}
+        params["system"] = system[0]["content"] if system else None
+        try:
+            key = json.dumps(params, sort_keys=True, ensure_ascii=False)
+        except TypeError:
+            return None, None
+        return key, user["content"]
+
+    def _flush(self, key: str) -> None:
+        handle = self._flush_handles.pop(key, None)
+        if handle is not None:
+            handle.cancel()
+        batch = self._pending.pop(key, [])
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._run_batch(batch))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[ChatPayload, str, asyncio.Future]]) -> None:
+        if len(batch) == 1:
+            payload, _, future = batch[0]
+            await self._resolve(future, self._single(payload))
+            return
+
+        self._packed_requests += 1
+        try:
+            packed = await self._single(_build_packed_payload(batch))
+        except Exception:
+            # 打包请求失败（如其中一条触发内容审核）时逐条重试，避免一条输入拖累整组
+            answers = {}
+        else:
+            if packed.finish_reason == "length":
+                # 回复被 max_tokens 截断，JSON 通常无法解析，相关条目会退回单独调用
+                self._truncated_replies += 1
+            answers = _parse_packed_reply(packed.text, len(batch))
+        fallbacks = []
+        for index, (payload, _, future) in enumerate(batch, start=1):
+            if future.done():
+                continue
+            if index in answers:
+                self._packed_items += 1
+                future.set_result(ChatResult(
+                    text=answers[index],
+                    finish_reason=packed.finish_reason,
+                    request_id=packed.request_id,
+                    status_code=packed.status_code,
+                ))
+            else:
+                self._fallback_items += 1
+                fallbacks.append(self._resolve(future, self._single(payload)))
+        if fallbacks:
+            await asyncio.gather(*fallbacks)
+
+    async def _single(self, payload: ChatPayload) -> ChatResult:
+        self._api_calls += 1
+        return await self.target.chat(payload)
+
+    @staticmethod
+    async def _resolve(future: asyncio.Future, coro) -> None:
+        try:
+            result = await coro
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
+
+
+def _build_packed_payload(batch: List[Tuple[ChatPayload, str, asyncio.Future]]) -> ChatPayload:
+    """把同组条目合并为一条带编号的请求，其余参数沿用第一条 payload。"""
+    first = batch[0][0]
+    system = next((m["content"] for m in first["messages"] if m.get("role") == "system"), None)
+    instruction = _PACK_INSTRUCTION.format(count=len(batch))
+    system_content = f"{system}\n\n{instruction}" if system else instruction
+    user_content = "\n\n".join(f"[{i}]\n{text}" for i, (_, text, _) in enumerate(batch, start=1))
+
+    packed = {k: v for k, v in first.items() if k not in ("messages", TRACE_ID_KEY)}
+    if packed.get("max_tokens"):
+        # max_tokens 是单条任务的上限，按条目数放大，避免合并后的 JSON 回复被截断
+        packed["max_tokens"] = (int(packed["max_tokens"]) + _PACK_TOKENS_PER_ITEM) * len(batch)
+    packed["messages"] = [
+        {"role": "system", "content": system_content},
+        {"role": "user", "content": user_content},
+    ]
+    return packed
+
+
+_CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def _parse_packed_reply(text: Optional[str], count: int) -> Dict[int, str]:
+    """解析模型返回的 JSON，返回 {编号: 回答}；缺失或无法解析的编号不出现在结果中。"""
+    if not text:
+        return {}
+    text = _CODE_FENCE.sub("", text.strip())
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end <= start:
+        return {}
+    try:
+        data = json.loads(text[start:end + 1])
+    except ValueError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+
+    answers = {}
+    for index in range(1, count + 1):
+        value = data.get(str(index))
+        if value is None:
+            continue
+        answers[index] = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+    return answers
+
+
+__all__ = ["PromptPacker"]
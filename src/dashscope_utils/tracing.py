@@ -0,0 +1,230 @@
+import contextlib
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .types import ChatPayload
+
+# payload 中记录 trace ID 的内部字段，不透传给 SDK
+TRACE_ID_KEY = "_trace_id"
+
+
+class Span:
+    """一段计时区间。"""
+
+    __slots__ = ("name", "span_id", "parent_id", "start", "end", "thread_id", "attrs")
+
+    def __init__(self, name: str, span_id: int, parent_id: Optional[int], attrs: Dict[str, Any]) -> None:
+        self.name = name
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.thread_id = threading.get_ident()
+        self.attrs = attrs
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+
+class Trace:
+    """一个请求的完整时间线。"""
+
+    def __init__(self, trace_id: str) -> None:
+        self.trace_id = trace_id
+        self.spans: List[Span] = []
+        self._ids = itertools.count(1)
+
+    def new_span(self, name: str, parent_id: Optional[int], attrs: Dict[str, Any]) -> Span:
+        span = Span(name, next(self._ids), parent_id, attrs)
+        # list.append 在 GIL 下是原子的，线程池中的预处理也可以直接记录
+        self.spans.append(span)
+        return span
+
+    @property
+    def duration(self) -> float:
+        return self.spans[0].duration if self.spans else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """导出为扁平的 JSON 结构（通过 parent_id 还原嵌套），时间为相对请求开始的秒数。"""
+        origin = self.spans[0].start if self.spans else 0.0
+        return {
+            "trace_id": self.trace_id,
+            "duration": self.duration,
+            "spans": [
+                {
+                    "name": span.name,
+                    "span_id": span.span_id,
+                    "parent_id": span.parent_id,
+                    "start": span.start - origin,
+                    "duration": span.duration,
+                    "thread_id": span.thread_id,
+                    "attrs": span.attrs,
+                }
+                for span in self.spans
+            ],
+        }
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """导出为 Chrome trace 格式，可在 chrome://tracing 或 Perfetto 中打开。"""
+        origin = self.spans[0].start if self.spans else 0.0
+        events = [{"name": "process_name", "ph": "M", "pid": 1, "args": {"name": f"trace {self.trace_id}"}}]
+        events.extend(
+            {
+                "name": span.name,
+                "ph": "X",
+                "ts": (span.start - origin) * 1e6,
+                "dur": span.duration * 1e6,
+                "pid": 1,
+                "tid": span.thread_id,
+                "args": {"span_id": span.span_id, "parent_id": span.parent_id, **span.attrs},
+            }
+            for span in self.spans
+        )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+class Tracer:
+    """轻量的按请求计时器。
+
+    每个请求（RateLimitManager.chat 或客户端 chat）生成一个 trace ID 并写入其 payload 副本，
+    限流等待、预处理、每个媒体的解码/编码、上传凭证获取、OSS 上传与 API 调用均记录为嵌套 span。
+    总耗时超过 ``slow_threshold`` 的请求保留在内存中，并可导出为 JSON 或 Chrome trace 文件。
+
+    Example:
+        >>> from dashscope_utils import Tracer, set_tracer
+        >>> set_tracer(Tracer(slow_threshold=10, export_dir="/tmp/slow_traces", export_format="chrome"))
+    """
+
+    def __init__(
+        self,
+        slow_threshold: float = 5.0,
+        export_dir: Optional[str] = None,
+        export_format: str = "chrome",
+        keep_slow: int = 100,
+    ) -> None:
+        """
+        Args:
+            slow_threshold: 慢请求阈值（秒）
+            export_dir: 慢请求导出目录，None 表示只保留在内存中
+            export_format: 导出格式，"chrome" 或 "json"
+            keep_slow: 内存中保留的最近慢请求数
+        """
+        if export_format not in ("chrome", "json"):
+            raise ValueError("export_format 只支持 'chrome' 或 'json'")
+        self.slow_threshold = slow_threshold
+        self.export_dir = export_dir
+        self.export_format = export_format
+        self._slow: Deque[Trace] = deque(maxlen=keep_slow)
+        if export_dir:
+            os.makedirs(export_dir, exist_ok=True)
+
+    def start_trace(self, trace_id: Optional[str] = None) -> Trace:
+        return Trace(trace_id or uuid.uuid4().hex)
+
+    def finish_trace(self, trace: Trace) -> None:
+        if trace.duration < self.slow_threshold:
+            return
+        self._slow.append(trace)
+        if self.export_dir:
+            self.export(trace)
+
+    def export(self, trace: Trace) -> str:
+        """将 trace 写入 export_dir，返回文件路径。"""
+        if not self.export_dir:
+            raise ValueError("未设置 export_dir")
+        if self.export_format == "chrome":
+            path = os.path.join(self.export_dir, f"{trace.trace_id}.trace.json")
+            data = trace.to_chrome_trace()
+        else:
+            path = os.path.join(self.export_dir, f"{trace.trace_id}.json")
+            data = trace.to_dict()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, default=str)
+        return path
+
+    def slow_traces(self) -> List[Trace]:
+        """返回内存中保留的最近慢请求。"""
+        return list(self._slow)
+
+
+_tracer: Optional[Tracer] = None
+_current: ContextVar[Optional[Tuple[Trace, Span]]] = ContextVar("dashscope_utils_span", default=None)
+_NOOP = contextlib.nullcontext()
+
+
+def set_tracer(tracer: Optional[Tracer]) -> None:
+    """设置全局 tracer；传入 None 关闭追踪（默认关闭，此时埋点几乎无开销）。"""
+    global _tracer
+    _tracer = tracer
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+
+class _SpanScope:
+    def __init__(self, trace: Trace, name: str, attrs: Dict[str, Any], tracer: Optional[Tracer] = None) -> None:
+        self._trace = trace
+        self._name = name
+        self._attrs = attrs
+        # 仅根 span 持有 tracer，结束时整体提交
+        self._tracer = tracer
+        self._span: Optional[Span] = None
+        self._token = None
+
+    def __enter__(self) -> Span:
+        current = _current.get()
+        parent_id = current[1].span_id if current is not None else None
+        self._span = self._trace.new_span(self._name, parent_id, self._attrs)
+        self._token = _current.set((self._trace, self._span))
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._span.end = time.perf_counter()
+        if exc_type is not None:
+            self._span.attrs["error"] = exc_type.__name__
+        _current.reset(self._token)
+        if self._tracer is not None:
+            self._tracer.finish_trace(self._trace)
+
+
+def trace_request(payload: ChatPayload, name: str, **attrs: Any):
+    """请求入口埋点：已在某个 trace 内则作为子 span，否则新建 trace 并把 trace ID 写入 payload。"""
+    current = _current.get()
+    if current is not None:
+        payload.setdefault(TRACE_ID_KEY, current[0].trace_id)
+        return _SpanScope(current[0], name, attrs)
+    tracer = _tracer
+    if tracer is None:
+        return _NOOP
+    trace = tracer.start_trace(payload.get(TRACE_ID_KEY))
+    payload[TRACE_ID_KEY] = trace.trace_id
+    return _SpanScope(trace, name, attrs, tracer=tracer)
+
+
+def span(name: str, **attrs: Any):
+    """在当前 trace 中记录一个子 span；不在 trace 内时为空操作。"""
+    current = _current.get()
+    if current is None:
+        return _NOOP
+    return _SpanScope(current[0], name, attrs)
+
+
+__all__ = [
+    "TRACE_ID_KEY",
+    "Span",
+    "Trace",
+    "Tracer",
+    "set_tracer",
+    "get_tracer",
+    "trace_request",
+    "span",
+]
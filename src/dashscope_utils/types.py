@@ -1,7 +1,117 @@
-from typing import Any, Dict
+import json
+from typing import Any, Dict, Optional
 
 
 ChatPayload = Dict[str, Any]
-ChatResult = Dict[str, Any]
+
+
+class ChatResult:
+    """精简的对话结果。
+
+    只保留文本、推理过程、结束原因、用量与请求 ID 等常用字段，
+    使用 ``__slots__`` 以降低大批量结果常驻内存的开销，并可快速序列化为 JSON。
+    原始 SDK 响应默认不保留，需要时在构造时传入 ``keep_raw=True``。
+    """
+
+    __slots__ = ("text", "reasoning_content", "finish_reason", "usage", "request_id", "status_code", "_raw")
+
+    def __init__(
+        self,
+        text: Optional[str] = None,
+        reasoning_content: Optional[str] = None,
+        finish_reason: Optional[str] = None,
+        usage: Optional[Dict[str, Any]] = None,
+        request_id: Optional[str] = None,
+        status_code: Optional[int] = 200,
+        raw: Any = None,
+    ) -> None:
+        self.text = text
+        self.reasoning_content = reasoning_content
+        self.finish_reason = finish_reason
+        self.usage = usage
+        self.request_id = request_id
+        self.status_code = status_code
+        self._raw = raw
+
+    @property
+    def raw(self) -> Any:
+        """原始 SDK 响应；未保留时为 None。"""
+        return self._raw
+
+    @classmethod
+    def from_response(cls, response: Any, keep_raw: bool = False) -> "ChatResult":
+        """从 DashScope 响应（SDK 对象或同结构的 dict）中提取字段。
+
+        Args:
+            response: AioGeneration / AioMultiModalConversation 的返回值，或 REST 接口的 JSON
+            keep_raw: 是否保留原始响应对象，默认不保留以节省内存
+
+        Returns:
+            ChatResult 实例
+        """
+        output = _get(response, "output") or {}
+        text = _get(output, "text")
+        finish_reason = _get(output, "finish_reason")
+        reasoning_content = None
+
+        choices = _get(output, "choices")
+        if choices:
+            choice = choices[0]
+            message = _get(choice, "message") or {}
+            if text is None:
+                text = _content_to_text(_get(message, "content"))
+            reasoning_content = _get(message, "reasoning_content") or None
+            finish_reason = _get(choice, "finish_reason") or finish_reason
+
+        usage = _get(response, "usage")
+        status_code = _get(response, "status_code", 200)
+        return cls(
+            text=text,
+            reasoning_content=reasoning_content,
+            finish_reason=finish_reason,
+            usage=dict(usage) if usage else None,
+            request_id=_get(response, "request_id"),
+            status_code=int(status_code) if status_code is not None else None,
+            raw=response if keep_raw else None,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可 JSON 序列化的 dict（不含原始响应）。"""
+        return {
+            "text": self.text,
+            "reasoning_content": self.reasoning_content,
+            "finish_reason": self.finish_reason,
+            "usage": self.usage,
+            "request_id": self.request_id,
+            "status_code": self.status_code,
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, separators=(",", ":"))
+
+    def __repr__(self) -> str:
+        return (
+            f"ChatResult(request_id={self.request_id!r}, finish_reason={self.finish_reason!r}, "
+            f"text={self.text!r})"
+        )
+
+
+def _get(obj: Any, key: str, default: Any = None) -> Any:
+    """兼容 dict 与属性访问的取值。"""
+    if obj is None:
+        return default
+    if isinstance(obj, dict):
+        return obj.get(key, default)
+    return getattr(obj, key, default)
+
+
+def _content_to_text(content: Any) -> Optional[str]:
+    """多模态接口的 content 为 [{"text": ...}, ...]，拼接其中的文本。"""
+    if content is None or isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(item["text"] for item in content if isinstance(item, dict) and "text" in item)
+    return str(content)
+
 
 __all__ = ["ChatPayload", "ChatResult"]
@@ -1,5 +1,13 @@
 from .dashscope_file_uploader import DashScopeFileUploader
 from .upload_helpers import upload_file_to_oss
 from .media_utils import process_media_content
+from .upload_scheduler import UploadScheduler, get_upload_scheduler, set_upload_scheduler
 
-__all__ = ["DashScopeFileUploader", "upload_file_to_oss", "process_media_content"]
\ No newline at end of file
+__all__ = [
+    "DashScopeFileUploader",
+    "upload_file_to_oss",
+    "process_media_content",
+    "UploadScheduler",
+    "set_upload_scheduler",
+    "get_upload_scheduler",
+]
\ No newline at end of file
@@ -4,6 +4,10 @@ from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 
+from ..deadline import current_deadline
+from ..tracing import span
+from .upload_scheduler import ThrottledMultipartBody, UploadScheduler, get_upload_scheduler
+
 
 class DashScopeFileUploader:
     """DashScope 文件上传工具类
@@ -12,17 +16,19 @@ class DashScopeFileUploader:
     上传的文件有效期为 48 小时。
     """
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, scheduler: Optional[UploadScheduler] = None):
         """初始化上传器
         
         Args:
             api_key: DashScope API Key，如果不提供则从环境变量 DASHSCOPE_API_KEY 获取
+            scheduler: 上传调度器，控制带宽与并发；不提供则使用 set_upload_scheduler 设置的全局调度器（默认无）
         """
         self.api_key = api_key or os.getenv("DASHSCOPE_API_KEY")
         if not self.api_key:
             raise ValueError("API Key 未提供，请通过参数传入或设置 DASHSCOPE_API_KEY 环境变量")
         
         self.upload_url = "https://dashscope.aliyuncs.com/api/v1/uploads"
+        self.scheduler = scheduler if scheduler is not None else get_upload_scheduler()
     
     def _get_upload_policy(self, model_name: str) -> Dict[str, Any]:
         """获取文件上传凭证
@@ -66,18 +72,39 @@ class DashScopeFileUploader:
         """
         file_name = Path(file_path).name
         key = f"{policy_data['upload_dir']}/{file_name}"
+        # 两种上传方式共用同一组表单字段，保证编码一致
+        fields = [
+            ('OSSAccessKeyId', policy_data['oss_access_key_id']),
+            ('Signature', policy_data['signature']),
+            ('policy', policy_data['policy']),
+            ('x-oss-object-acl', policy_data['x_oss_object_acl']),
+            ('x-oss-forbid-overwrite', policy_data['x_oss_forbid_overwrite']),
+            ('key', key),
+            ('success_action_status', '200'),
+        ]
+        
+        if self.scheduler is not None:
+            # 经调度器限速，流式发送文件内容
+            body = ThrottledMultipartBody(
+                fields=fields,
+                file_field='file',
+                file_name=file_name,
+                file_path=file_path,
+                file_size=Path(file_path).stat().st_size,
+                scheduler=self.scheduler,
+            )
+            try:
+                response = requests.post(policy_data['upload_host'], data=body,
+                                         headers={'Content-Type': body.content_type})
+            finally:
+                body.close()
+            if response.status_code != 200:
+                raise Exception(f"文件上传失败: {response.text}")
+            return f"oss://{key}"
         
         with open(file_path, 'rb') as file:
-            files = {
-                'OSSAccessKeyId': (None, policy_data['oss_access_key_id']),
-                'Signature': (None, policy_data['signature']),
-                'policy': (None, policy_data['policy']),
-                'x-oss-object-acl': (None, policy_data['x_oss_object_acl']),
-                'x-oss-forbid-overwrite': (None, policy_data['x_oss_forbid_overwrite']),
-                'key': (None, key),
-                'success_action_status': (None, '200'),
-                'file': (file_name, file)
-            }
+            files = [(name, (None, value)) for name, value in fields]
+            files.append(('file', (file_name, file)))
             
             response = requests.post(policy_data['upload_host'], files=files)
             if response.status_code != 200:
@@ -108,11 +135,21 @@ class DashScopeFileUploader:
         if not Path(file_path).exists():
             raise FileNotFoundError(f"文件不存在: {file_path}")
         
+        if self.scheduler is not None:
+            # 排到名额后再获取凭证，避免凭证在排队期间过期；请求的截止时间过后放弃排队
+            with self.scheduler.slot(Path(file_path).stat().st_size, deadline_at=current_deadline()):
+                with span("upload.policy"):
+                    policy_data = self._get_upload_policy(model_name)
+                with span("upload.oss_post", file_size=Path(file_path).stat().st_size):
+                    return self._upload_file_to_oss(policy_data, file_path)
+        
         # 1. 获取上传凭证（上传凭证接口有限流，超出限流将导致请求失败）
-        policy_data = self._get_upload_policy(model_name)
+        with span("upload.policy"):
+            policy_data = self._get_upload_policy(model_name)
         
         # 2. 上传文件到OSS
-        oss_url = self._upload_file_to_oss(policy_data, file_path)
+        with span("upload.oss_post", file_size=Path(file_path).stat().st_size):
+            oss_url = self._upload_file_to_oss(policy_data, file_path)
         
         return oss_url
     
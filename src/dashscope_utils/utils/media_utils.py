@@ -6,6 +6,7 @@ from urllib.parse import unquote
 
 from PIL import Image
 
+from ..tracing import span
 from .upload_helpers import upload_file_to_oss
 
 
@@ -58,18 +59,23 @@ def process_image(image_url: str, max_size_mb: int = 10, temp_dir: str = None) -
         quality = max(int(base_quality * ratio), 20)
         # 直接压缩到内存并返回 base64，避免生成临时文件
         with Image.open(image_path) as img:
-            img = img.convert("RGB")
-            buffer = BytesIO()
-            img.save(buffer, "JPEG", optimize=True, quality=quality)
-            buffer.seek(0)
-            base64_image = base64.b64encode(buffer.read()).decode("utf-8")
+            with span("image.decode", file_size=file_size):
+                img = img.convert("RGB")
+            with span("image.compress", quality=quality):
+                buffer = BytesIO()
+                img.save(buffer, "JPEG", optimize=True, quality=quality)
+                buffer.seek(0)
+            with span("image.base64"):
+                base64_image = base64.b64encode(buffer.read()).decode("utf-8")
         return f"data:image/jpeg;base64,{base64_image}"
     else:
         # 不压缩也直接返回 base64，保持原始 MIME
-        mime = Image.open(image_path).get_format_mimetype() or "application/octet-stream"
-        with open(image_path, "rb") as f:
-            raw = f.read()
-        base64_image = base64.b64encode(raw).decode("utf-8")
+        with span("image.read", file_size=file_size):
+            mime = Image.open(image_path).get_format_mimetype() or "application/octet-stream"
+            with open(image_path, "rb") as f:
+                raw = f.read()
+        with span("image.base64"):
+            base64_image = base64.b64encode(raw).decode("utf-8")
         return f"data:{mime};base64,{base64_image}"
 
 
@@ -155,16 +161,52 @@ def process_media_content(content: List[Dict[str, Any]], api_key: str, model_nam
             
         # 处理图像
         if "image" in entry:
-            entry["image"] = process_image(entry["image"], temp_dir=temp_dir)
+            with span("media.image"):
+                entry["image"] = process_image(entry["image"], temp_dir=temp_dir)
         
         # 处理视频
         if "video" in entry:
             video_value = entry["video"]
             if isinstance(video_value, list):
                 # 视频帧列表
-                entry["video"] = process_video_frames(video_value, temp_dir=temp_dir)
+                with span("media.video_frames", frames=len(video_value)):
+                    entry["video"] = process_video_frames(video_value, temp_dir=temp_dir)
             else:
                 # 单个视频文件
-                entry["video"] = process_video_file(video_value, api_key, model_name)
+                with span("media.video"):
+                    entry["video"] = process_video_file(video_value, api_key, model_name)
     
     return content
+
+
+def upload_local_media(content: List[Dict[str, Any]], api_key: str, model_name: str = "qwen-vl-plus") -> List[Dict[str, Any]]:
+    """将内容中仍为本地 file:// 的媒体上传到 OSS 并替换为 oss:// URL
+
+    SDK 会在调用时自动上传本地文件，直连 HTTP 接口时需要提前完成这一步。
+
+    Args:
+        content: 已经过 process_media_content 处理的多模态内容列表
+        api_key: API密钥
+        model_name: 模型名称
+
+    Returns:
+        处理后的内容列表
+    """
+    if not isinstance(content, list):
+        return content
+
+    for entry in content:
+        if not isinstance(entry, dict):
+            continue
+        for key in ("image", "video", "audio"):
+            value = entry.get(key)
+            if isinstance(value, str) and _is_local_file_url(value):
+                entry[key] = upload_file_to_oss(unquote(value[len("file://"):]), model_name, api_key)
+            elif isinstance(value, list):
+                entry[key] = [
+                    upload_file_to_oss(unquote(v[len("file://"):]), model_name, api_key)
+                    if isinstance(v, str) and _is_local_file_url(v) else v
+                    for v in value
+                ]
+
+    return content
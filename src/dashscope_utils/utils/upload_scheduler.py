@@ -0,0 +1,258 @@
+import heapq
+import itertools
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from urllib3.fields import RequestField
+
+from ..deadline import check_deadline
+from ..errors import DeadlineExceeded
+from ..tracing import span
+
+
+class UploadScheduler:
+    """全局上传调度器，在多个上传之间共享带宽预算与并发上限
+
+    - 同时进行的上传数不超过 ``max_concurrent``，排队时小文件优先；
+      等待越久排序越靠前（``aging_rate``），大文件不会被源源不断的小文件无限插队。
+    - 所有上传共享 ``bytes_per_second`` 的令牌桶，按块限速发送文件内容。
+    - 统计排队深度、吞吐与每次上传的排队/上传耗时。
+
+    上传在线程池中同步执行，调度器基于线程同步原语实现。
+
+    Example:
+        >>> from dashscope_utils.utils import UploadScheduler, set_upload_scheduler
+        >>> set_upload_scheduler(UploadScheduler(bytes_per_second=50 * 1024 * 1024, max_concurrent=2))
+    """
+
+    def __init__(
+        self,
+        bytes_per_second: Optional[float] = None,
+        max_concurrent: int = 2,
+        chunk_size: int = 256 * 1024,
+        history_size: int = 100,
+        aging_rate: float = 10 * 1024 * 1024,
+    ) -> None:
+        """初始化调度器
+
+        Args:
+            bytes_per_second: 所有上传共享的带宽预算（字节/秒），None 表示不限速
+            max_concurrent: 同时进行的最大上传数
+            chunk_size: 限速时每次发送的数据块大小（字节）
+            history_size: 保留最近多少次上传的耗时记录
+            aging_rate: 排队老化速度（字节/秒），每等待 1 秒，排序用的文件大小减少该值；
+                默认 10 MB/s，即 2 GB 的文件最多被后来的小文件插队约 200 秒。0 表示严格小文件优先
+        """
+        if max_concurrent <= 0:
+            raise ValueError("max_concurrent 必须为正整数")
+        if bytes_per_second is not None and bytes_per_second <= 0:
+            raise ValueError("bytes_per_second 必须为正数")
+        if aging_rate < 0:
+            raise ValueError("aging_rate 不能为负数")
+        self.bytes_per_second = bytes_per_second
+        self.max_concurrent = max_concurrent
+        self.chunk_size = chunk_size
+        self.aging_rate = aging_rate
+
+        self._cond = threading.Condition()
+        # (排序键, 序号) 小顶堆。排序键 = 文件大小 - aging_rate * 已等待时间，
+        # 减去所有排队者共有的 aging_rate * now 后等价于 文件大小 + aging_rate * 入队时间，入队后不再变化
+        self._waiting: List[Tuple[float, int]] = []
+        self._seq = itertools.count()
+        self._epoch = time.monotonic()
+        self._active = 0
+
+        self._bucket_lock = threading.Lock()
+        self._tokens = float(bytes_per_second or 0)
+        self._last_refill = time.monotonic()
+
+        self._bytes_sent = 0
+        self._busy_since: Optional[float] = None
+        self._busy_time = 0.0
+        self._completed = 0
+        self._failed = 0
+        self._expired = 0
+        self._history: Deque[Dict[str, float]] = deque(maxlen=history_size)
+
+    @contextmanager
+    def slot(self, file_size: int, deadline_at: Optional[float] = None) -> Iterator[None]:
+        """申请一个上传名额，退出时归还；排队时按老化后的文件大小从小到大放行
+
+        Args:
+            file_size: 文件大小（字节）
+            deadline_at: 请求的绝对截止时间（time.monotonic()），排队超过该时间则放弃，
+                抛出 DeadlineExceeded，不再上传；None 表示不限
+        """
+        enqueued = time.monotonic()
+        ticket = (file_size + self.aging_rate * (enqueued - self._epoch), next(self._seq))
+        with span("upload.queue_wait", file_size=file_size), self._cond:
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while self._active >= self.max_concurrent or self._waiting[0] != ticket:
+                    self._cond.wait(check_deadline(deadline_at, "upload_queue"))
+                # 排到名额时预算可能已耗尽，放弃上传以免浪费带宽
+                check_deadline(deadline_at, "upload_queue")
+                self._active += 1
+                if self._busy_since is None:
+                    self._busy_since = time.monotonic()
+            except DeadlineExceeded:
+                self._expired += 1
+                raise
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                # 队首已变化（放行或放弃排队），唤醒其他排队者
+                self._cond.notify_all()
+
+        started = time.monotonic()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            finished = time.monotonic()
+            with self._cond:
+                self._active -= 1
+                if failed:
+                    self._failed += 1
+                else:
+                    self._completed += 1
+                    self._history.append({
+                        "file_size": file_size,
+                        "queue_wait": started - enqueued,
+                        "upload_time": finished - started,
+                    })
+                if self._active == 0 and self._busy_since is not None:
+                    self._busy_time += finished - self._busy_since
+                    self._busy_since = None
+                self._cond.notify_all()
+
+    def throttle(self, nbytes: int) -> None:
+        """消耗 nbytes 的带宽令牌，不足时阻塞等待（允许短暂透支，由后续请求偿还）"""
+        if self.bytes_per_second is not None:
+            with self._bucket_lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    float(self.bytes_per_second),
+                    self._tokens + (now - self._last_refill) * self.bytes_per_second,
+                )
+                self._last_refill = now
+                self._tokens -= nbytes
+                wait = -self._tokens / self.bytes_per_second if self._tokens < 0 else 0.0
+            if wait > 0:
+                time.sleep(wait)
+        with self._cond:
+            self._bytes_sent += nbytes
+
+    def stats(self) -> Dict[str, Any]:
+        """返回排队深度、并发数、吞吐与最近上传耗时统计"""
+        with self._cond:
+            busy_time = self._busy_time
+            if self._busy_since is not None:
+                busy_time += time.monotonic() - self._busy_since
+            history = list(self._history)
+            stats = {
+                "queue_depth": len(self._waiting),
+                "active": self._active,
+                "completed": self._completed,
+                "failed": self._failed,
+                "expired": self._expired,
+                "bytes_sent": self._bytes_sent,
+                "throughput_bps": self._bytes_sent / busy_time if busy_time > 0 else 0.0,
+            }
+
+        upload_times = sorted(h["upload_time"] for h in history)
+        queue_waits = sorted(h["queue_wait"] for h in history)
+        stats["upload_time_p50"] = upload_times[len(upload_times) // 2] if upload_times else 0.0
+        stats["upload_time_max"] = upload_times[-1] if upload_times else 0.0
+        stats["queue_wait_p50"] = queue_waits[len(queue_waits) // 2] if queue_waits else 0.0
+        stats["queue_wait_max"] = queue_waits[-1] if queue_waits else 0.0
+        stats["recent_uploads"] = history
+        return stats
+
+
+class ThrottledMultipartBody:
+    """按块读取并限速的 multipart/form-data 请求体
+
+    提供 ``__len__`` 以便 requests 设置 Content-Length，并通过 ``read`` 流式发送，
+    避免将大文件整体读入内存。
+    """
+
+    def __init__(
+        self,
+        fields: List[Tuple[str, str]],
+        file_field: str,
+        file_name: str,
+        file_path: str,
+        file_size: int,
+        scheduler: UploadScheduler,
+    ) -> None:
+        self.boundary = uuid.uuid4().hex
+        self._scheduler = scheduler
+        self._file_path = file_path
+
+        parts = []
+        for name, value in fields:
+            parts.append(self._part_header(RequestField(name=name, data=value)))
+            parts.append(str(value).encode("utf-8") + b"\r\n")
+        file_part = RequestField(name=file_field, data=b"", filename=file_name)
+        parts.append(self._part_header(file_part))
+        self._prelude = b"".join(parts)
+        self._epilogue = f"\r\n--{self.boundary}--\r\n".encode("ascii")
+        self._length = len(self._prelude) + file_size + len(self._epilogue)
+
+        self._stage = 0
+        self._file = None
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def _part_header(self, field: RequestField) -> bytes:
+        field.make_multipart()
+        return f"--{self.boundary}\r\n".encode("ascii") + field.render_headers().encode("utf-8")
+
+    def __len__(self) -> int:
+        return self._length
+
+    def read(self, size: int = -1) -> bytes:
+        if self._stage == 0:
+            self._stage = 1
+            self._file = open(self._file_path, "rb")
+            return self._prelude
+        if self._stage == 1:
+            chunk = self._file.read(self._scheduler.chunk_size)
+            if chunk:
+                self._scheduler.throttle(len(chunk))
+                return chunk
+            self._file.close()
+            self._stage = 2
+            return self._epilogue
+        return b""
+
+    def close(self) -> None:
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+
+
+_default_scheduler: Optional[UploadScheduler] = None
+
+
+def set_upload_scheduler(scheduler: Optional[UploadScheduler]) -> None:
+    """设置全局上传调度器，之后创建的 DashScopeFileUploader 默认共享它；传入 None 关闭调度"""
+    global _default_scheduler
+    _default_scheduler = scheduler
+
+
+def get_upload_scheduler() -> Optional[UploadScheduler]:
+    """返回当前的全局上传调度器"""
+    return _default_scheduler
+
+
+__all__ = ["UploadScheduler", "ThrottledMultipartBody", "set_upload_scheduler", "get_upload_scheduler"]
@@ -0,0 +1,44 @@
+import asyncio
+from typing import List, Optional
+
+from dashscope_utils.clients.base import BaseLLMClient
+from dashscope_utils.deadline import effective_timeout
+from dashscope_utils.types import ChatPayload, ChatResult
+
+
+class StubClient(BaseLLMClient):
+    """不访问网络的测试客户端：记录收到的 payload，按设定延迟返回或抛出异常。"""
+
+    def __init__(self, delay: float = 0.0, error: Optional[BaseException] = None) -> None:
+        super().__init__(api_key="test-key", default_model="stub-model")
+        self.delay = delay
+        self.error = error
+        self.calls: List[ChatPayload] = []
+
+    async def _execute_chat(self, prepared_payload: ChatPayload) -> ChatResult:
+        self.calls.append(prepared_payload)
+        await asyncio.sleep(self.delay)
+        effective_timeout(prepared_payload, None)
+        if self.error is not None:
+            raise self.error
+        model = prepared_payload.get("model") or self.default_model
+        return ChatResult(text=f"{model}:{prepared_payload['messages'][-1]['content']}")
+
+
+def user_payload(text: str = "hi", **extra) -> ChatPayload:
+    return {"messages": [{"role": "user", "content": text}], **extra}
+
+
+class SDKLikeClient(StubClient):
+    """仿照 SDK：以 effective_timeout 作为请求超时，超时抛出 asyncio.TimeoutError。"""
+
+    def __init__(self, delay: float = 0.0, timeout: Optional[float] = 300) -> None:
+        super().__init__(delay=delay)
+        self.timeout = timeout
+
+    async def _execute_chat(self, prepared_payload: ChatPayload) -> ChatResult:
+        self.calls.append(prepared_payload)
+        timeout = effective_timeout(prepared_payload, self.timeout)
+        await asyncio.wait_for(asyncio.sleep(self.delay), timeout=timeout)
+        model = prepared_payload.get("model") or self.default_model
+        return ChatResult(text=f"{model}:{prepared_payload['messages'][-1]['content']}")
@@ -0,0 +1,191 @@
+import asyncio
+import time
+
+import pytest
+
+from dashscope_utils import (
+    APIStatusError,
+    CircuitBreaker,
+    CircuitBreakerRegistry,
+    CircuitOpenError,
+    DeadlineExceeded,
+    RateLimitManager,
+)
+
+from helpers import SDKLikeClient, StubClient, user_payload
+
+
+def _open_breaker(**kwargs) -> CircuitBreaker:
+    breaker = CircuitBreaker(min_calls=2, window_size=2, **kwargs)
+    for _ in range(2):
+        breaker.record_failure(breaker.allow_request())
+    assert breaker.state == CircuitBreaker.OPEN
+    return breaker
+
+
+def test_opens_on_failure_rate_and_rejects():
+    breaker = _open_breaker()
+    assert breaker.allow_request() is None
+    assert breaker.snapshot()["rejected"] == 1
+
+
+def test_half_open_probes_close_breaker():
+    breaker = _open_breaker(open_duration=0.01, half_open_max_calls=2)
+    time.sleep(0.02)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    probes = [breaker.allow_request(), breaker.allow_request()]
+    assert breaker.allow_request() is None
+    for generation in probes:
+        breaker.record_success(generation, 0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_probe_failure_reopens():
+    breaker = _open_breaker(open_duration=0.01, half_open_max_calls=2)
+    time.sleep(0.02)
+    breaker.record_failure(breaker.allow_request())
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_slow_calls_open_breaker():
+    breaker = CircuitBreaker(min_calls=2, window_size=2, slow_call_threshold=1.0)
+    for _ in range(2):
+        breaker.record_success(breaker.allow_request(), 5.0)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_late_results_from_before_opening_are_ignored():
+    breaker = CircuitBreaker(min_calls=2, window_size=2, open_duration=0.01, half_open_max_calls=1)
+    # 打开前已放行、长时间未返回的请求
+    late_failure = breaker.allow_request()
+    late_success = breaker.allow_request()
+    for _ in range(2):
+        breaker.record_failure(breaker.allow_request())
+    time.sleep(0.02)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    probe = breaker.allow_request()
+    assert probe is not None
+    breaker.record_failure(late_failure)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # 迟到结果不归还探测名额
+    assert breaker.allow_request() is None
+
+    breaker.record_success(late_success, 0.1)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record_success(probe, 0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_stale_release_does_not_free_probe_slot():
+    breaker = CircuitBreaker(min_calls=1, window_size=1, open_duration=0.01, half_open_max_calls=1)
+    stale = breaker.allow_request()
+    breaker.record_failure(breaker.allow_request())
+    time.sleep(0.02)
+
+    assert breaker.allow_request() is not None
+    breaker.release(stale)
+    assert breaker.allow_request() is None
+
+
+def test_registry_routes_to_fallback_and_fails_fast():
+    registry = CircuitBreakerRegistry(fallbacks={"primary": ["backup"]}, min_calls=1, window_size=1)
+    model, generation = registry.route("primary")
+    assert model == "primary"
+    registry.get("primary").record_failure(generation)
+
+    model, generation = registry.route("primary")
+    assert model == "backup"
+    registry.get("backup").record_failure(generation)
+
+    with pytest.raises(CircuitOpenError):
+        registry.route("primary")
+    assert registry.snapshot()["rerouted"] == 1
+
+
+class _FailingClient(StubClient):
+    def __init__(self, errors):
+        super().__init__()
+        self.errors = list(errors)
+
+    async def _execute_chat(self, prepared_payload):
+        if self.errors:
+            raise self.errors.pop(0)
+        return await super()._execute_chat(prepared_payload)
+
+
+@pytest.mark.parametrize("error", [
+    APIStatusError("bad request", status_code=400, code="InvalidParameter"),
+    APIStatusError("inspection", status_code=400, code="DataInspectionFailed"),
+    ValueError("model 未提供"),
+])
+@pytest.mark.anyio
+async def test_caller_errors_do_not_open_breaker(error):
+    registry = CircuitBreakerRegistry(fallbacks={"stub-model": ["backup"]}, min_calls=2, window_size=2)
+    limiter = RateLimitManager(_FailingClient([error] * 3), concurrency=1, breakers=registry)
+    for _ in range(3):
+        with pytest.raises(type(error)):
+            await limiter.chat(user_payload())
+    assert registry.get("stub-model").state == CircuitBreaker.CLOSED
+    assert (await limiter.chat(user_payload())).text == "stub-model:hi"
+
+
+@pytest.mark.parametrize("error", [
+    APIStatusError("server error", status_code=500),
+    APIStatusError("throttled", status_code=429),
+    asyncio.TimeoutError(),
+])
+@pytest.mark.anyio
+async def test_server_errors_open_breaker_and_reroute(error):
+    registry = CircuitBreakerRegistry(fallbacks={"stub-model": ["backup"]}, min_calls=2, window_size=2)
+    limiter = RateLimitManager(_FailingClient([error] * 2), concurrency=1, breakers=registry)
+    for _ in range(2):
+        with pytest.raises(type(error)):
+            await limiter.chat(user_payload())
+    assert registry.get("stub-model").state == CircuitBreaker.OPEN
+    assert (await limiter.chat(user_payload())).text == "backup:hi"
+
+
+@pytest.mark.anyio
+async def test_deadline_cut_timeouts_do_not_open_breaker():
+    registry = CircuitBreakerRegistry(fallbacks={"stub-model": ["backup"]}, min_calls=2, window_size=2)
+    limiter = RateLimitManager(SDKLikeClient(delay=0.2), concurrency=2, breakers=registry)
+    for _ in range(2):
+        with pytest.raises(DeadlineExceeded):
+            await limiter.chat(user_payload(deadline=0.05))
+
+    assert registry.get("stub-model").state == CircuitBreaker.CLOSED
+    assert limiter.stats()["expired"] == 2
+    assert (await limiter.chat(user_payload())).text == "stub-model:hi"
+
+
+@pytest.mark.anyio
+async def test_configured_timeouts_still_open_breaker():
+    registry = CircuitBreakerRegistry(fallbacks={"stub-model": ["backup"]}, min_calls=2, window_size=2)
+    limiter = RateLimitManager(SDKLikeClient(delay=0.2, timeout=0.05), concurrency=2, breakers=registry)
+    for _ in range(2):
+        with pytest.raises(asyncio.TimeoutError) as excinfo:
+            await limiter.chat(user_payload(deadline=5))
+        assert not isinstance(excinfo.value, DeadlineExceeded)
+
+    assert registry.get("stub-model").state == CircuitBreaker.OPEN
+    assert limiter.stats()["expired"] == 0
+
+
+@pytest.mark.anyio
+async def test_fallback_does_not_pin_caller_payload():
+    registry = CircuitBreakerRegistry(
+        fallbacks={"stub-model": ["backup"]}, min_calls=1, window_size=1, open_duration=0.01, half_open_max_calls=1,
+    )
+    limiter = RateLimitManager(_FailingClient([APIStatusError("down", status_code=503)]), concurrency=1,
+                               breakers=registry)
+    payload = user_payload()
+    with pytest.raises(APIStatusError):
+        await limiter.chat(payload)
+
+    assert (await limiter.chat(payload)).text == "backup:hi"
+    assert "model" not in payload
+
+    await asyncio.sleep(0.02)
+    assert (await limiter.chat(payload)).text == "stub-model:hi"
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from dashscope_utils import DeadlineExceeded, QueueFullError, RateLimitManager
+from dashscope_utils.deadline import DEADLINE_AT_KEY, effective_timeout
+from dashscope_utils.types import ChatResult
+
+from helpers import StubClient, user_payload
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_payload_can_be_resubmitted_after_deadline_window():
+    limiter = RateLimitManager(StubClient(), concurrency=1)
+    payload = user_payload(deadline=0.2)
+
+    await limiter.chat(payload)
+    assert DEADLINE_AT_KEY not in payload
+
+    await asyncio.sleep(0.25)
+    result = await limiter.chat(payload)
+    assert result.text == "stub-model:hi"
+
+
+async def test_client_chat_does_not_stamp_caller_payload():
+    client = StubClient()
+    payload = user_payload(deadline=0.2)
+    await client.chat(payload)
+    assert payload == user_payload(deadline=0.2)
+
+
+async def test_queue_wait_past_deadline_is_shed():
+    client = StubClient(delay=0.2)
+    limiter = RateLimitManager(client, concurrency=1)
+
+    first = asyncio.ensure_future(limiter.chat(user_payload("slow")))
+    await asyncio.sleep(0)
+    with pytest.raises(DeadlineExceeded):
+        await limiter.chat(user_payload("late", deadline=0.05))
+    await first
+
+    assert len(client.calls) == 1
+    assert limiter.stats()["expired"] == 1
+
+
+async def test_expiry_after_slot_acquired_is_counted():
+    class SlowPrepareClient(StubClient):
+        async def prepare(self, payload):
+            prepared = await super().prepare(payload)
+            await asyncio.sleep(0.1)
+            return prepared
+
+        async def execute(self, prepared_payload):
+            # 模拟发送前的额外耗时（如建连），使预算在拿到槽位之后才耗尽
+            await asyncio.sleep(0.1)
+            return await super().execute(prepared_payload)
+
+    limiter = RateLimitManager(SlowPrepareClient(), concurrency=1)
+    with pytest.raises(DeadlineExceeded):
+        await limiter.chat(user_payload(deadline=0.15))
+    assert limiter.stats()["expired"] == 1
+
+
+async def test_full_queue_rejects_and_payload_is_retryable():
+    limiter = RateLimitManager(StubClient(delay=0.1), concurrency=1, max_queue=1)
+    payload = user_payload(deadline=1)
+
+    first = asyncio.ensure_future(limiter.chat(user_payload("first")))
+    await asyncio.sleep(0)
+    second = asyncio.ensure_future(limiter.chat(user_payload("second")))
+    await asyncio.sleep(0)
+    with pytest.raises(QueueFullError):
+        await limiter.chat(payload)
+    assert limiter.stats()["rejected"] == 1
+
+    await asyncio.gather(first, second)
+    result = await limiter.chat(payload)
+    assert result.text == "stub-model:hi"
+
+
+async def test_multimodal_payload_survives_expiry_after_prepare(tmp_path):
+    from PIL import Image
+
+    from dashscope_utils import DashScopeClient
+
+    class SlowDashScopeClient(DashScopeClient):
+        async def _execute_chat(self, prepared_payload):
+            await asyncio.sleep(0.1)
+            effective_timeout(prepared_payload, None)
+            return ChatResult(text=prepared_payload["messages"][0]["content"][0]["image"][:10])
+
+    image_path = tmp_path / "cat.png"
+    Image.new("RGB", (4, 4)).save(image_path)
+    image_url = f"file://{image_path}"
+    payload = {"messages": [{"role": "user", "content": [{"image": image_url}, {"text": "描述图片"}]}]}
+
+    async with SlowDashScopeClient(api_key="test-key", default_model="qwen-vl-plus") as client:
+        limiter = RateLimitManager(client, concurrency=1)
+        with pytest.raises(DeadlineExceeded):
+            await limiter.chat({**payload, "deadline": 0.05})
+        assert payload["messages"][0]["content"][0]["image"] == image_url
+
+        result = await limiter.chat(payload)
+    assert result.text == "data:image"
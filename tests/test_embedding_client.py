@@ -0,0 +1,94 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from dashscope_utils import APIStatusError
+from dashscope_utils.clients import embedding_client
+from dashscope_utils.clients.embedding_client import DashScopeEmbeddingClient
+
+pytestmark = pytest.mark.anyio
+
+
+def _vector(text):
+    return [float(len(text)), float(sum(map(ord, text)))]
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """替换 TextEmbedding.call，按 text_index 倒序返回；skip 中的文本不返回向量，reject 中的文本使整个请求返回 400。"""
+    recorded = []
+    skip = set()
+    reject = set()
+
+    def fake_call(model, input, api_key, request_timeout, **kwargs):
+        recorded.append(list(input))
+        if reject.intersection(input):
+            return SimpleNamespace(status_code=400, code="InvalidParameter", output=None)
+        embeddings = [
+            {"text_index": i, "embedding": _vector(text)}
+            for i, text in enumerate(input)
+            if text not in skip
+        ]
+        return SimpleNamespace(status_code=200, code=None, output={"embeddings": embeddings[::-1]})
+
+    monkeypatch.setattr(embedding_client.TextEmbedding, "call", fake_call)
+    return SimpleNamespace(batches=recorded, skip=skip, reject=reject)
+
+
+async def test_concurrent_embeds_are_batched(calls):
+    async with DashScopeEmbeddingClient(api_key="test-key", max_batch_size=3, max_wait=0.01) as client:
+        texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+        matrix = await client.embed_many(texts)
+
+    assert [len(batch) for batch in calls.batches] == [3, 2]
+    assert matrix.dtype == np.float32
+    np.testing.assert_array_equal(matrix, np.asarray([_vector(t) for t in texts], dtype=np.float32))
+
+
+async def test_missing_index_fails_batch_instead_of_misaligning(calls):
+    calls.skip.add("")
+    async with DashScopeEmbeddingClient(api_key="test-key", max_batch_size=10, max_wait=0.01) as client:
+        results = await asyncio.wait_for(
+            asyncio.gather(*[client.embed(t) for t in ["a", "", "b"]], return_exceptions=True),
+            timeout=1,
+        )
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+async def test_short_batch_result_resolves_every_future(monkeypatch, calls):
+    async with DashScopeEmbeddingClient(api_key="test-key", max_batch_size=10, max_wait=0.01) as client:
+        async def short_chat(payload):
+            return np.zeros((1, 2), dtype=np.float32)
+
+        monkeypatch.setattr(client, "chat", short_chat)
+        results = await asyncio.wait_for(
+            asyncio.gather(*[client.embed(t) for t in ["a", "b"]], return_exceptions=True),
+            timeout=1,
+        )
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+async def test_rejected_text_does_not_fail_rest_of_batch(calls):
+    calls.reject.add("")
+    async with DashScopeEmbeddingClient(api_key="test-key", max_batch_size=10, max_wait=0.01) as client:
+        results = await asyncio.gather(*[client.embed(t) for t in ["a", "", "b"]], return_exceptions=True)
+
+    np.testing.assert_array_equal(results[0], np.asarray(_vector("a"), dtype=np.float32))
+    assert isinstance(results[1], APIStatusError) and results[1].status_code == 400
+    np.testing.assert_array_equal(results[2], np.asarray(_vector("b"), dtype=np.float32))
+    assert calls.batches == [["a", "", "b"], ["a"], [""], ["b"]]
+
+
+async def test_server_errors_fail_batch_without_retry(monkeypatch, calls):
+    def unavailable(model, input, api_key, request_timeout, **kwargs):
+        calls.batches.append(list(input))
+        return SimpleNamespace(status_code=503, code="ServiceUnavailable", output=None)
+
+    monkeypatch.setattr(embedding_client.TextEmbedding, "call", unavailable)
+    async with DashScopeEmbeddingClient(api_key="test-key", max_batch_size=10, max_wait=0.01) as client:
+        results = await asyncio.gather(*[client.embed(t) for t in ["a", "b"]], return_exceptions=True)
+    assert all(isinstance(r, APIStatusError) for r in results)
+    assert len(calls.batches) == 1
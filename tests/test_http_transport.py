@@ -0,0 +1,96 @@
+import dashscope
+import pytest
+from aiohttp import web
+
+from dashscope_utils import APIStatusError, DashScopeClient, DashScopeHTTPTransport
+from dashscope_utils.utils import media_utils
+
+pytestmark = pytest.mark.anyio
+
+STUB_RESPONSE = {
+    "output": {"choices": [{"finish_reason": "stop", "message": {"role": "assistant", "content": "ok"}}]},
+    "usage": {"input_tokens": 5, "output_tokens": 1, "total_tokens": 6},
+    "request_id": "stub-request-id",
+}
+
+
+@pytest.fixture
+async def stub_server():
+    """本地桩服务：记录收到的请求，按 ``state["reply"]`` 返回。"""
+    state = {"requests": [], "reply": None}
+
+    async def handle(request):
+        state["requests"].append({"path": request.path, "headers": request.headers, "body": await request.json()})
+        if state["reply"] is not None:
+            return state["reply"]
+        return web.json_response(STUB_RESPONSE)
+
+    app = web.Application()
+    app.router.add_post("/api/v1/services/aigc/text-generation/generation", handle)
+    app.router.add_post("/api/v1/services/aigc/multimodal-generation/generation", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    state["base_url"] = f"http://127.0.0.1:{runner.addresses[0][1]}/api/v1"
+    yield state
+    await runner.cleanup()
+
+
+@pytest.mark.parametrize("content", [
+    "你好",
+    [{"image": "https://example.com/cat.jpg"}, {"text": "描述图片"}],
+])
+async def test_request_body_matches_sdk(stub_server, monkeypatch, content):
+    monkeypatch.setattr(dashscope, "base_http_api_url", stub_server["base_url"])
+    payload = {"model": "qwen-plus", "messages": [{"role": "user", "content": content}], "temperature": 0.1}
+
+    async with DashScopeClient(api_key="test-key") as sdk_client:
+        await sdk_client.chat(payload)
+    transport = DashScopeHTTPTransport(base_url=stub_server["base_url"])
+    async with DashScopeClient(api_key="test-key", transport=transport) as client:
+        result = await client.chat(payload)
+
+    sdk_request, transport_request = stub_server["requests"]
+    assert transport_request["path"] == sdk_request["path"]
+    assert transport_request["body"] == sdk_request["body"]
+    assert transport_request["headers"]["Authorization"] == "Bearer test-key"
+    assert result.text == "ok"
+
+
+async def test_non_json_error_raises_api_status_error(stub_server):
+    stub_server["reply"] = web.Response(status=502, text="Bad Gateway", content_type="text/plain")
+    transport = DashScopeHTTPTransport(base_url=stub_server["base_url"])
+    async with DashScopeClient(api_key="test-key", default_model="qwen-plus", transport=transport) as client:
+        with pytest.raises(APIStatusError) as excinfo:
+            await client.chat({"messages": [{"role": "user", "content": "hi"}]})
+    assert excinfo.value.status_code == 502
+    assert excinfo.value.code == "Unknown"
+
+
+async def test_local_media_is_uploaded_and_oss_resolution_enabled(stub_server, monkeypatch, tmp_path):
+    video = tmp_path / "clip.mp4"
+    video.write_bytes(b"\x00" * 16)
+    uploaded = []
+
+    def fake_upload(file_path, model_name="qwen-vl-plus", api_key=None):
+        uploaded.append(file_path)
+        return "oss://dashscope-instant/clip.mp4"
+
+    monkeypatch.setattr(media_utils, "upload_file_to_oss", fake_upload)
+    transport = DashScopeHTTPTransport(base_url=stub_server["base_url"])
+    payload = {"messages": [{"role": "user", "content": [{"video": f"file://{video}"}, {"text": "总结视频"}]}]}
+    async with DashScopeClient(api_key="test-key", default_model="qwen-vl-plus", transport=transport) as client:
+        await client.chat(payload)
+
+    request = stub_server["requests"][0]
+    assert uploaded == [str(video)]
+    assert request["body"]["input"]["messages"][0]["content"][0] == {"video": "oss://dashscope-instant/clip.mp4"}
+    assert request["headers"]["X-DashScope-OssResourceResolve"] == "enable"
+
+
+async def test_plain_urls_do_not_request_oss_resolution(stub_server):
+    transport = DashScopeHTTPTransport(base_url=stub_server["base_url"])
+    async with DashScopeClient(api_key="test-key", default_model="qwen-plus", transport=transport) as client:
+        await client.chat({"messages": [{"role": "user", "content": [{"image": "https://example.com/a.jpg"}]}]})
+    assert "X-DashScope-OssResourceResolve" not in stub_server["requests"][0]["headers"]
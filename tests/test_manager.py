@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from dashscope_utils import RateLimitManager
+from dashscope_utils.types import ChatResult
+
+from helpers import StubClient, user_payload
+
+pytestmark = pytest.mark.anyio
+
+
+class TrackingClient(StubClient):
+    """记录预处理与调用的并发情况。"""
+
+    def __init__(self, prepare_delay: float = 0.05, delay: float = 0.05) -> None:
+        super().__init__(delay=delay)
+        self.prepare_delay = prepare_delay
+        self.preparing = 0
+        self.executing = 0
+        self.max_preparing = 0
+        self.overlapped = False
+
+    async def prepare(self, payload):
+        self.preparing += 1
+        self.max_preparing = max(self.max_preparing, self.preparing)
+        self.overlapped = self.overlapped or self.executing > 0
+        try:
+            await asyncio.sleep(self.prepare_delay)
+            return await super().prepare(payload)
+        finally:
+            self.preparing -= 1
+
+    async def execute(self, prepared_payload):
+        self.executing += 1
+        try:
+            return await super().execute(prepared_payload)
+        finally:
+            self.executing -= 1
+
+
+async def test_prepare_runs_outside_slot_and_respects_prefetch():
+    client = TrackingClient()
+    limiter = RateLimitManager(client, concurrency=1, prefetch=2)
+    results = await asyncio.gather(*[limiter.chat(user_payload(str(i))) for i in range(6)])
+
+    assert [r.text for r in results] == [f"stub-model:{i}" for i in range(6)]
+    assert client.overlapped
+    assert client.max_preparing <= 2
+    assert limiter.stats()["preparing"] == 0
+
+
+async def test_client_overriding_chat_is_not_bypassed():
+    class CustomChatClient(StubClient):
+        async def chat(self, payload):
+            result = await super().chat(payload)
+            return ChatResult(text=f"custom:{result.text}")
+
+    limiter = RateLimitManager(CustomChatClient(), concurrency=1)
+    assert (await limiter.chat(user_payload())).text == "custom:stub-model:hi"
+
+
+async def test_pipeline_can_be_disabled_explicitly():
+    client = TrackingClient()
+    limiter = RateLimitManager(client, concurrency=1, pipeline=False)
+    await asyncio.gather(*[limiter.chat(user_payload(str(i))) for i in range(3)])
+    assert not client.overlapped
+
+
+def test_pipeline_requires_prepare_and_execute():
+    class ChatOnly:
+        async def chat(self, payload):
+            return ChatResult(text="ok")
+
+    with pytest.raises(ValueError):
+        RateLimitManager(ChatOnly(), concurrency=1, pipeline=True)
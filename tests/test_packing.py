@@ -0,0 +1,101 @@
+import asyncio
+import json
+
+import pytest
+
+from dashscope_utils import APIStatusError, PromptPacker
+from dashscope_utils.types import ChatResult
+
+from helpers import StubClient
+
+pytestmark = pytest.mark.anyio
+
+SYSTEM = {"role": "system", "content": "判断情感"}
+
+
+def _payload(text):
+    return {"messages": [SYSTEM, {"role": "user", "content": text}]}
+
+
+class PackingStub(StubClient):
+    """打包请求按编号回显 JSON；单条请求回显 ``single:<text>``；包含 blocked 的输入触发 400。"""
+
+    def __init__(self, reply=None, finish_reason="stop"):
+        super().__init__()
+        self.reply = reply
+        self.finish_reason = finish_reason
+
+    async def _execute_chat(self, prepared_payload):
+        self.calls.append(prepared_payload)
+        user = prepared_payload["messages"][-1]["content"]
+        if "blocked" in user:
+            raise APIStatusError("inspection", status_code=400, code="DataInspectionFailed")
+        if len(self.calls) > 1 or "[1]" not in user:
+            return ChatResult(text=f"single:{user}")
+        if self.reply is not None:
+            return ChatResult(text=self.reply, finish_reason=self.finish_reason)
+        items = [chunk.split("\n", 1) for chunk in user.split("\n\n")]
+        return ChatResult(text=json.dumps({key.strip("[]"): f"packed:{text}" for key, text in items}))
+
+
+async def _run(packer, texts):
+    return await asyncio.gather(*[packer.chat(_payload(t)) for t in texts], return_exceptions=True)
+
+
+async def test_group_is_packed_and_split_back():
+    client = PackingStub()
+    packer = PromptPacker(client, max_items=3, max_wait=0.01)
+    results = await _run(packer, ["a", "b", "c"])
+
+    assert [r.text for r in results] == ["packed:a", "packed:b", "packed:c"]
+    assert len(client.calls) == 1
+    assert packer.stats()["packing_ratio"] == 3.0
+
+
+async def test_unparsable_reply_falls_back_per_item():
+    packer = PromptPacker(PackingStub(reply="不是 JSON"), max_items=2, max_wait=0.01)
+    results = await _run(packer, ["a", "b"])
+    assert [r.text for r in results] == ["single:a", "single:b"]
+    assert packer.stats()["fallback_items"] == 2
+
+
+async def test_failed_packed_request_only_fails_offending_item():
+    client = PackingStub()
+    packer = PromptPacker(client, max_items=3, max_wait=0.01)
+    results = await _run(packer, ["a", "blocked", "c"])
+
+    assert results[0].text == "single:a"
+    assert isinstance(results[1], APIStatusError)
+    assert results[2].text == "single:c"
+    assert packer.stats()["fallback_items"] == 3
+
+
+async def test_multimodal_and_deadline_payloads_pass_through():
+    client = PackingStub()
+    packer = PromptPacker(client, max_items=5, max_wait=0.01)
+    multimodal = {"messages": [{"role": "user", "content": [{"text": "mm"}]}]}
+    with_deadline = {**_payload("d"), "deadline": 5}
+    results = await asyncio.gather(packer.chat(multimodal), packer.chat(with_deadline))
+
+    assert results[1].text == "single:d"
+    assert packer.stats()["passthrough"] == 2
+
+
+async def test_max_tokens_is_scaled_by_item_count():
+    client = PackingStub()
+    packer = PromptPacker(client, max_items=3, max_wait=0.01)
+    results = await asyncio.gather(*[packer.chat({**_payload(t), "max_tokens": 5}) for t in "abc"])
+
+    assert [r.text for r in results] == ["packed:a", "packed:b", "packed:c"]
+    assert client.calls[0]["max_tokens"] == (5 + 8) * 3
+
+
+async def test_truncated_reply_is_counted():
+    packer = PromptPacker(PackingStub(reply='{"1": "正面", "2": "负', finish_reason="length"), max_items=2,
+                          max_wait=0.01)
+    results = await _run(packer, ["a", "b"])
+
+    assert [r.text for r in results] == ["single:a", "single:b"]
+    stats = packer.stats()
+    assert stats["truncated_replies"] == 1
+    assert stats["fallback_items"] == 2
@@ -0,0 +1,115 @@
+import json
+import threading
+
+import pytest
+from PIL import Image
+
+from dashscope_utils import DashScopeClient, RateLimitManager, Tracer, set_tracer
+from dashscope_utils.clients import dashscope_client
+from dashscope_utils.tracing import TRACE_ID_KEY, get_tracer
+
+from helpers import StubClient, user_payload
+
+pytestmark = pytest.mark.anyio
+
+OK_RESPONSE = {
+    "status_code": 200,
+    "request_id": "req-1",
+    "output": {"text": "ok", "finish_reason": "stop"},
+    "usage": {"input_tokens": 1, "output_tokens": 1, "total_tokens": 2},
+}
+
+
+@pytest.fixture
+def tracer(tmp_path):
+    tracer = Tracer(slow_threshold=0, export_dir=str(tmp_path / "traces"), export_format="json")
+    set_tracer(tracer)
+    yield tracer
+    set_tracer(None)
+
+
+@pytest.fixture
+def sdk_calls(monkeypatch):
+    """替换 SDK 调用，记录实际下发的参数。"""
+    calls = []
+
+    async def fake_call(**kwargs):
+        calls.append(kwargs)
+        return OK_RESPONSE
+
+    monkeypatch.setattr(dashscope_client.AioGeneration, "call", fake_call)
+    monkeypatch.setattr(dashscope_client.AioMultiModalConversation, "call", fake_call)
+    return calls
+
+
+async def test_spans_nest_through_manager_and_prepare_thread(tracer, sdk_calls, tmp_path):
+    image = tmp_path / "cat.png"
+    Image.new("RGB", (4, 4)).save(image)
+    payload = {
+        "model": "qwen-vl-plus",
+        "messages": [{"role": "user", "content": [{"image": f"file://{image}"}, {"text": "描述图片"}]}],
+    }
+
+    async with DashScopeClient(api_key="test-key") as client:
+        manager = RateLimitManager(client, concurrency=1)
+        result = await manager.chat(payload)
+    assert result.text == "ok"
+    assert TRACE_ID_KEY not in payload
+
+    [trace] = tracer.slow_traces()
+    spans = {s.name: s for s in trace.spans}
+    assert trace.spans[0].name == "RateLimitManager.chat"
+    assert spans["prepare"].parent_id == trace.spans[0].span_id
+    assert spans["api_call"].parent_id == trace.spans[0].span_id
+    # 线程池中的媒体处理通过 copy_context 挂在 prepare 之下
+    assert spans["media.image"].parent_id == spans["prepare"].span_id
+    assert spans["image.read"].parent_id == spans["media.image"].span_id
+    assert spans["media.image"].thread_id != threading.get_ident()
+    assert spans["api_call"].attrs["model"] == "qwen-vl-plus"
+
+
+async def test_trace_id_is_not_sent_to_sdk(tracer, sdk_calls):
+    async with DashScopeClient(api_key="test-key", default_model="qwen-plus") as client:
+        await client.chat(user_payload(temperature=0.1))
+    [kwargs] = sdk_calls
+    assert TRACE_ID_KEY not in kwargs
+    assert kwargs["temperature"] == 0.1
+    assert tracer.slow_traces()[0].spans[0].name == "client.chat"
+
+
+async def test_only_slow_traces_are_kept_and_exported(tmp_path):
+    export_dir = tmp_path / "traces"
+    set_tracer(Tracer(slow_threshold=0.05, export_dir=str(export_dir), export_format="chrome"))
+    try:
+        await StubClient(delay=0).chat(user_payload())
+        assert get_tracer().slow_traces() == []
+        assert list(export_dir.iterdir()) == []
+
+        await StubClient(delay=0.1).chat(user_payload())
+        [trace] = get_tracer().slow_traces()
+        [path] = export_dir.iterdir()
+        assert path.name == f"{trace.trace_id}.trace.json"
+        assert json.loads(path.read_text(encoding="utf-8"))["traceEvents"][1]["name"] == "client.chat"
+    finally:
+        set_tracer(None)
+
+
+async def test_chrome_trace_structure(tracer):
+    await StubClient(delay=0.01).chat(user_payload())
+    [trace] = tracer.slow_traces()
+    data = trace.to_chrome_trace()
+
+    assert data["displayTimeUnit"] == "ms"
+    meta, *events = data["traceEvents"]
+    assert meta == {"name": "process_name", "ph": "M", "pid": 1, "args": {"name": f"trace {trace.trace_id}"}}
+    assert [e["name"] for e in events] == ["client.chat", "prepare", "api_call"]
+    root = events[0]
+    assert root["ph"] == "X" and root["ts"] == 0 and root["dur"] >= 10_000
+    for event in events:
+        assert {"ts", "dur", "pid", "tid", "args"} <= event.keys()
+        assert event["ts"] + event["dur"] <= root["dur"] + 1
+    assert events[1]["args"]["parent_id"] == root["args"]["span_id"]
+    assert root["args"]["client"] == "StubClient"
+    # json 格式导出与 to_dict 一致
+    with open(tracer.export(trace), encoding="utf-8") as f:
+        assert json.load(f)["spans"][0]["span_id"] == root["args"]["span_id"]
@@ -0,0 +1,69 @@
+import json
+from http import HTTPStatus
+
+from dashscope.api_entities.dashscope_response import (
+    DashScopeAPIResponse,
+    GenerationResponse,
+    MultiModalConversationResponse,
+)
+
+from dashscope_utils import ChatResult
+
+USAGE = {"input_tokens": 5, "output_tokens": 2, "total_tokens": 7}
+
+
+def _api_response(output):
+    return DashScopeAPIResponse(status_code=HTTPStatus.OK, request_id="req-1", output=output, usage=USAGE)
+
+
+def test_text_format_output():
+    response = {
+        "status_code": 200,
+        "request_id": "req-1",
+        "output": {"text": "你好", "finish_reason": "stop"},
+        "usage": USAGE,
+    }
+    result = ChatResult.from_response(response)
+    assert (result.text, result.finish_reason, result.request_id) == ("你好", "stop", "req-1")
+    assert result.usage == USAGE
+    assert result.reasoning_content is None
+
+
+def test_message_format_with_reasoning_from_sdk_response():
+    response = GenerationResponse.from_api_response(_api_response({
+        "choices": [{
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": "答案是 4", "reasoning_content": "2 + 2 = 4"},
+        }],
+    }))
+    result = ChatResult.from_response(response)
+    assert result.text == "答案是 4"
+    assert result.reasoning_content == "2 + 2 = 4"
+    assert result.finish_reason == "stop"
+    assert result.status_code == 200 and isinstance(result.status_code, int)
+    assert result.usage["total_tokens"] == 7
+
+
+def test_multimodal_content_parts_are_joined():
+    response = MultiModalConversationResponse.from_api_response(_api_response({
+        "choices": [{
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": [{"text": "一只"}, {"image": "ignored"}, {"text": "猫"}]},
+        }],
+    }))
+    result = ChatResult.from_response(response)
+    assert result.text == "一只猫"
+    assert result.finish_reason == "stop"
+
+
+def test_raw_response_is_kept_only_on_request():
+    response = {"status_code": 200, "output": {"text": "ok"}}
+    assert ChatResult.from_response(response).raw is None
+    assert ChatResult.from_response(response, keep_raw=True).raw is response
+
+
+def test_to_json_round_trip():
+    result = ChatResult(text="好", reasoning_content="想", finish_reason="stop", usage=USAGE, request_id="req-1")
+    data = json.loads(result.to_json())
+    assert data == result.to_dict()
+    assert ChatResult(**data).to_dict() == result.to_dict()
@@ -0,0 +1,175 @@
+import asyncio
+import threading
+import time
+
+import pytest
+import requests
+
+from dashscope_utils import DashScopeClient
+from dashscope_utils.deadline import run_with_deadline
+from dashscope_utils.errors import DeadlineExceeded
+from dashscope_utils.utils import UploadScheduler
+from dashscope_utils.utils import dashscope_file_uploader, media_utils
+from dashscope_utils.utils.dashscope_file_uploader import DashScopeFileUploader
+
+
+def _admission_order(scheduler, sizes, gap=0.0):
+    """占住唯一名额，让 sizes 依次排队，释放后返回实际放行顺序。"""
+    order = []
+    blocker = scheduler.slot(0)
+    blocker.__enter__()
+
+    def upload(size):
+        with scheduler.slot(size):
+            order.append(size)
+
+    threads = []
+    for size in sizes:
+        thread = threading.Thread(target=upload, args=(size,))
+        thread.start()
+        threads.append(thread)
+        while scheduler.stats()["queue_depth"] < len(threads):
+            time.sleep(0.001)
+        time.sleep(gap)
+
+    blocker.__exit__(None, None, None)
+    for thread in threads:
+        thread.join(timeout=5)
+    return order
+
+
+def test_smallest_file_first_without_aging():
+    scheduler = UploadScheduler(max_concurrent=1, aging_rate=0)
+    assert _admission_order(scheduler, [3000, 500, 1000, 2000]) == [500, 1000, 2000, 3000]
+    assert scheduler.stats()["completed"] == 5
+
+
+def test_aging_lets_long_waiting_large_file_go_first():
+    scheduler = UploadScheduler(max_concurrent=1, aging_rate=1_000_000)
+    # 大文件先等待 50ms，相当于排序时减少 50 KB，排在之后到达的小文件前面
+    assert _admission_order(scheduler, [10_000, 100], gap=0.05) == [10_000, 100]
+
+
+def test_concurrency_cap():
+    scheduler = UploadScheduler(max_concurrent=2)
+    peak = []
+    lock = threading.Lock()
+
+    def upload():
+        with scheduler.slot(1):
+            with lock:
+                peak.append(scheduler.stats()["active"])
+            time.sleep(0.02)
+
+    threads = [threading.Thread(target=upload) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert max(peak) <= 2
+    assert scheduler.stats()["completed"] == 6
+
+
+def test_throttle_enforces_bandwidth_budget():
+    scheduler = UploadScheduler(bytes_per_second=1_000_000)
+    start = time.monotonic()
+    scheduler.throttle(1_500_000)
+    assert time.monotonic() - start >= 0.4
+    assert scheduler.stats()["bytes_sent"] == 1_500_000
+
+
+def test_throttled_body_matches_requests_encoding(monkeypatch, tmp_path):
+    policy = {
+        "upload_dir": "dashscope-instant/abc",
+        "upload_host": "https://oss.example.com",
+        "oss_access_key_id": "id",
+        "signature": "sig",
+        "policy": "policy",
+        "x_oss_object_acl": "private",
+        "x_oss_forbid_overwrite": "true",
+    }
+    path = tmp_path / "video.mp4"
+    path.write_bytes(b"x" * 1000)
+    bodies = []
+
+    def fake_post(url, data=None, files=None, headers=None):
+        prepared = requests.Request("POST", url, data=data, files=files, headers=headers).prepare()
+        body = prepared.body
+        if hasattr(body, "read"):
+            body = b"".join(iter(lambda: body.read(), b""))
+        boundary = prepared.headers["Content-Type"].split("boundary=")[1]
+        bodies.append(body.replace(boundary.encode(), b"BOUNDARY"))
+        return type("Response", (), {"status_code": 200, "text": ""})()
+
+    monkeypatch.setattr(dashscope_file_uploader.requests, "post", fake_post)
+    DashScopeFileUploader(api_key="test-key")._upload_file_to_oss(policy, str(path))
+    DashScopeFileUploader(api_key="test-key", scheduler=UploadScheduler(chunk_size=128))._upload_file_to_oss(
+        policy, str(path)
+    )
+    assert bodies[0] == bodies[1]
+
+
+def test_queue_wait_is_bounded_by_deadline():
+    scheduler = UploadScheduler(max_concurrent=1)
+    blocker = scheduler.slot(0)
+    blocker.__enter__()
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        with scheduler.slot(100, deadline_at=time.monotonic() + 0.05):
+            pass
+    assert time.monotonic() - start < 1
+    # 超时的排队票据已移除，不会挡住之后的请求
+    assert scheduler.stats()["queue_depth"] == 0
+    assert scheduler.stats()["expired"] == 1
+
+    admitted = []
+    waiter = threading.Thread(target=lambda: scheduler.slot(200).__enter__() or admitted.append(200))
+    waiter.start()
+    blocker.__exit__(None, None, None)
+    waiter.join(timeout=5)
+    assert admitted == [200]
+
+
+def test_uploader_reads_deadline_from_context(monkeypatch, tmp_path):
+    path = tmp_path / "video.mp4"
+    path.write_bytes(b"x" * 10)
+    scheduler = UploadScheduler(max_concurrent=1)
+    uploader = DashScopeFileUploader(api_key="test-key", scheduler=scheduler)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("截止时间已过，不应发起请求")
+
+    monkeypatch.setattr(dashscope_file_uploader.requests, "get", fail)
+    monkeypatch.setattr(dashscope_file_uploader.requests, "post", fail)
+    with pytest.raises(DeadlineExceeded):
+        run_with_deadline(time.monotonic() - 1, uploader.upload_file, str(path))
+    assert scheduler.stats()["expired"] == 1
+
+
+@pytest.mark.anyio
+async def test_upload_waits_do_not_occupy_prepare_pool(monkeypatch, tmp_path):
+    video = tmp_path / "clip.mp4"
+    with open(video, "wb") as f:
+        # 稀疏文件，超过 100MB 才会走上传
+        f.truncate(101 * 1024 * 1024)
+    release = threading.Event()
+
+    def blocking_upload(file_path, model_name="qwen-vl-plus", api_key=None):
+        release.wait(timeout=5)
+        return "oss://clip.mp4"
+
+    monkeypatch.setattr(media_utils, "upload_file_to_oss", blocking_upload)
+    async with DashScopeClient(api_key="test-key", max_workers=1, upload_workers=1) as client:
+        video_payload = {"messages": [{"role": "user", "content": [{"video": f"file://{video}"}]}]}
+        video_task = asyncio.ensure_future(client.prepare(video_payload))
+        await asyncio.sleep(0.05)
+        try:
+            # 视频上传卡住时，纯文本请求的预处理不受影响
+            prepared = await asyncio.wait_for(client.prepare({"messages": [{"role": "user", "content": "hi"}]}), 1)
+            assert prepared["messages"][0]["content"] == "hi"
+            assert not video_task.done()
+        finally:
+            release.set()
+        prepared = await video_task
+        assert prepared["messages"][0]["content"][0]["video"] == "oss://clip.mp4"